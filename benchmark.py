@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from src.intent import load_intent
+from src.validate import check_intent
+from src.step1 import step1
+from src.step2 import step2
+from src.step3 import step3
+from src.step4_ospf import step4_ospf
+from src.step4_ibgp import step4_ibgp
+from src.ecriture import ecriture_config
+from src.profiling import peak_rss
+from src.topology_generator import TOPOLOGIES, generate_intent
+
+# Command lines timed by --startup (python startup alone is the reference)
+STARTUP_COMMANDS = {
+    "python": ["-c", "pass"],
+    "help": ["pipeline.py", "--help"],
+    "dry-run": ["pipeline.py", "-n", "-f", "templates/example.yaml"],
+}
+STAGES = ["load", "validate", "step1", "step2", "step3", "step4_ospf", "step4_ibgp", "ecriture_config"]
+
+
+# Run every stage of the pipeline once on `intent_path`, returns
+# {stage: {"time": seconds, "peak_memory": bytes or None}}
+def run_once(intent_path: str, output_dir: str, jobs: int, memory: bool) -> dict:
+    results = {}
+    state = {}
+
+    def stage(name, function):
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        results[name] = {"time": elapsed, "peak_memory": peak}
+        return value
+
+    data = stage("load", lambda: load_intent(intent_path, use_cache=False))
+    links = stage("validate", lambda: check_intent(data))
+    stage("step1", lambda: step1(data, links=links))
+    state["routers"] = stage("step2", lambda: step2(data))
+    state["routers"] = stage("step3", lambda: step3(data, state["routers"], links=links))
+    state["routers"] = stage("step4_ospf", lambda: step4_ospf(data, state["routers"], links=links))
+    state["routers"] = stage("step4_ibgp", lambda: step4_ibgp(data, state["routers"], links=links))
+    stage(
+        "ecriture_config",
+        lambda: ecriture_config(
+            state["routers"], False, jobs, force=True, output_dir=output_dir
+        ),
+    )
+    results["routers"] = len(state["routers"])
+    return results
+
+
+# Best time (and matching memory) of each stage over `repeat` runs
+def benchmark(intent_path: str, repeat: int = 3, jobs: int = 1, memory: bool = False) -> dict:
+    runs = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(repeat):
+            runs.append(run_once(intent_path, output_dir, jobs, memory))
+
+    report = {"routers": runs[0]["routers"], "stages": {}}
+    for name in STAGES:
+        best = min(runs, key=lambda run: run[name]["time"])[name]
+        report["stages"][name] = best
+    report["total"] = sum(stage["time"] for stage in report["stages"].values())
+    report["max_rss"] = peak_rss()
+    return report
+
+
+# Best wall time of each CLI invocation over `repeat` runs, in seconds
+def startup_benchmark(repeat: int = 10) -> dict:
+    report = {}
+    for name, arguments in STARTUP_COMMANDS.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, *arguments], check=True, stdout=subprocess.DEVNULL
+            )
+            times.append(time.perf_counter() - start)
+        report[name] = min(times)
+    return report
+
+
+def print_report(title: str, report: dict):
+    print(f"\n{title} ({report['routers']} routers)")
+    for name, stage in report["stages"].items():
+        line = f"  {name:<16} {stage['time'] * 1000:10.1f} ms"
+        if stage["peak_memory"] is not None:
+            line += f" {stage['peak_memory'] / 2**20:10.1f} MiB"
+        print(line)
+    print(f"  {'total':<16} {report['total'] * 1000:10.1f} ms")
+    print(f"  {'max RSS':<16} {report['max_rss'] / 2**20:10.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages.")
+    parser.add_argument("-f", "--file", help="Benchmark an existing intent file")
+    parser.add_argument(
+        "-t", "--topology", action="append", choices=TOPOLOGIES,
+        help="Synthetic topology, can be repeated (default: every topology)",
+    )
+    parser.add_argument(
+        "-r", "--routers", type=int, action="append",
+        help="Router count, can be repeated (default: 100)",
+    )
+    parser.add_argument("-a", "--ases", type=int, default=4, help="ASes of multi-as topologies")
+    parser.add_argument("-i", "--igp", default="ospf,ibgp,rip", help="Comma separated IGPs, cycled per AS")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="Runs per case, the best is kept")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Rendering processes")
+    parser.add_argument("-m", "--memory", action="store_true", help="Trace peak memory per stage (slower)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument(
+        "--startup", action="store_true",
+        help="Time pipeline.py start up (--help, --dry-run) instead of the stages",
+    )
+    args = parser.parse_args()
+
+    if args.startup:
+        report = startup_benchmark(max(args.repeat, 10))
+        print("\nStartup (best of runs)")
+        for name, duration in report.items():
+            print(f"  {name:<16} {duration * 1000:10.1f} ms")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"startup": report}, f, indent=2)
+        sys.exit(0)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.file:
+            cases = [(args.file, args.file, {})]
+        else:
+            cases = []
+            for topology in args.topology or TOPOLOGIES:
+                for routers in args.routers or [100]:
+                    params = {
+                        "topology": topology,
+                        "routers": routers,
+                        "ases": args.ases,
+                        "igps": args.igp.split(","),
+                    }
+                    path = os.path.join(tmp, f"{topology}_{routers}.yaml")
+                    with open(path, "w") as f:
+                        yaml.safe_dump(generate_intent(**params), f, sort_keys=False)
+                    cases.append((f"{topology} x{routers}", path, params))
+
+        for title, path, params in cases:
+            report = benchmark(path, args.repeat, args.jobs, args.memory)
+            print_report(title, report)
+            results.append({"case": title, "params": params, **report})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
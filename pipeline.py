@@ -1,19 +1,34 @@
 #!/usr/bin/env python3
 import argparse
-import yaml
 from pprint import pprint
+from src.intent import load_intent
+from src.validate import check_intent
 from src.step1 import step1
 from src.step2 import step2
 from src.step3 import step3
 from src.step4_ospf import step4_ospf
 from src.step4_ibgp import step4_ibgp
-from src.ecriture import ecriture_config
-from src.config_to_gns3 import export_config
+from src.stream import stream_routers
+from src.parallel import resolve_parallel
+from src.allocator import read_subnets, write_subnets
+from src.archive import OUTPUT_DIR, OUTPUT_FORMATS, output_path
+from src.profiling import StageProfiler
+from src.simulate import simulate_routing
+
+# src.ecriture (jinja2), src.config_to_gns3 (gns3fy, requests, pydantic) and
+# src.watch are imported by the stages that use them: --help, --dry-run and
+# runs without -p don't pay for these imports
 
 
 def print_help():
     print(
-        "Usage: python pipeline.py [-f FILE | --file FILE] [-h | --help] [-v | --verbose] [-n | --dry-run]"
+        "Usage: python pipeline.py [-f FILE | --file FILE] [-h | --help] [-v | --verbose] [-c | --check] [--verify] [-n | --dry-run] [-j N | --jobs N] [-a N | --as-jobs N] [-F | --force] [-s | --stream] [--no-cache] [-D | --delta]"
+    )
+    print(
+        "       [-o FORMAT | --output-format FORMAT] [-p NAME | --project-name NAME] [-w N | --workers N] [--gns3-url URL] [-T | --build-topology] [-L | --live]"
+    )
+    print(
+        "       [-P DIR | --gns3-project DIR] [-t | --timings] [--profile DIR] [--timings-json FILE] [-W | --watch]"
     )
     print("Generate Cisco router configs from YAML configuration file.")
     print()
@@ -21,13 +36,43 @@ def print_help():
     print("  -f, --file FILE        |Specify the YAML config file (default: templates/example.yaml)")
     print("  -h, --help             |Show this help message and exit")
     print("  -v, --verbose          |Show logs as the pipeline is executed")
+    print("  -c, --check            |Only validate the intent file, reporting every problem at once")
+    print("      --verify           |Simulate OSPF and BGP offline, stop if a router loopback can't reach another one")
     print("  -n, --dry-run          |Run all steps without writing output files")
     print("  -p, --project-name NAME|Specify the gns3 project name")
+    print("  -j, --jobs N           |Render configs with N processes (0: one per CPU, default: 1)")
+    print("  -a, --as-jobs N        |Resolve steps 2 to 4 with N processes, one AS per task (0: one per CPU)")
+    print("  -F, --force            |Rewrite every config, even unchanged ones")
+    print("  -s, --stream           |Resolve and write routers one AS at a time (bounded memory)")
+    print("      --no-cache         |Always parse the YAML file, without the parsed intent cache")
+    print("  -D, --delta            |Also write NAME.delta: the IOS commands turning each rewritten config's previous version into the new one (dir output only)")
+    print("  -o, --output-format FMT|dir (one file per router, default), tar, zip or jsonl (single archive in output/)")
+    print("  -w, --workers N        |Update N GNS3 nodes concurrently (default: 1)")
+    print("      --gns3-url URL     |GNS3 server URL (default: http://localhost:3080)")
+    print("  -T, --build-topology   |With -p, create the routers and links of the intent missing from the GNS3 project")
+    print("  -L, --live             |With -p, apply the changed config sections over the router consoles instead of rebooting")
+    print("  -P, --gns3-project DIR |Write a complete GNS3 project (DIR/NAME.gns3, nodes, links, startup configs) without a server")
+    print("  -t, --timings          |Report wall time, CPU time, peak RSS and object count per stage")
+    print("      --profile DIR      |Same as --timings, and dump a cProfile file per stage in DIR")
+    print("      --timings-json FILE|Same as --timings, and write the measurements as JSON")
+    print("  -W, --watch            |Keep running, regenerate (and export) the configs affected by each edit of FILE (dir output only)")
     print()
     print("Examples:")
     print("  python pipeline.py")
     print("  python pipeline.py -f my_config.yaml")
     print("  python pipeline.py --dry-run")
+    print("  python pipeline.py -f my_config.yaml --check")
+    print("  python pipeline.py -f big.yaml --verify")
+    print("  python pipeline.py -j 8")
+    print("  python pipeline.py -f my_config.yaml -D")
+    print("  python pipeline.py -f internet.yaml -a 0 -j 0")
+    print("  python pipeline.py -p my_project -w 16")
+    print("  python pipeline.py -o tar -p my_project")
+    print("  python pipeline.py -f big.yaml -p my_project -T -w 16")
+    print("  python pipeline.py -p my_project --live")
+    print("  python pipeline.py -f big.yaml -P projects/big_lab")
+    print("  python pipeline.py -f big.yaml -n --profile profiles")
+    print("  python pipeline.py -f big.yaml -W -p my_project")
     print("  python pipeline.py --help")
 
 
@@ -43,6 +88,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output"
     )
+    parser.add_argument(
+        "-c", "--check", action="store_true", help="Only validate the intent file"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="Simulate routing and check loopback reachability"
+    )
     parser.add_argument(
         "-n",
         "--dry-run",
@@ -52,25 +103,150 @@ if __name__ == "__main__":
     parser.add_argument(
         "-p", "--project-name", help="Specify GNS3 project name"
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of rendering processes"
+    )
+    parser.add_argument(
+        "-a",
+        "--as-jobs",
+        type=int,
+        help="Number of processes resolving steps 2 to 4, one AS per task",
+    )
+    parser.add_argument(
+        "-F",
+        "--force",
+        action="store_true",
+        help="Rewrite and export every config, even unchanged ones",
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Resolve and write routers one AS at a time",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not use the parsed intent cache",
+    )
+    parser.add_argument(
+        "-D",
+        "--delta",
+        action="store_true",
+        help="Write the commands between the previous and the new configs",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-format",
+        default="dir",
+        choices=OUTPUT_FORMATS,
+        help="Write one file per router or a single archive",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Concurrent GNS3 node updates"
+    )
+    parser.add_argument(
+        "--gns3-url", default="http://localhost:3080", help="GNS3 server URL"
+    )
+    parser.add_argument(
+        "-T",
+        "--build-topology",
+        action="store_true",
+        help="Create the missing GNS3 nodes and links of the intent",
+    )
+    parser.add_argument(
+        "-L",
+        "--live",
+        action="store_true",
+        help="Push configs over the node consoles instead of restarting the nodes",
+    )
+    parser.add_argument(
+        "-P", "--gns3-project", help="Write an offline GNS3 project in this directory"
+    )
+    parser.add_argument(
+        "-t", "--timings", action="store_true", help="Report per-stage measurements"
+    )
+    parser.add_argument("--profile", help="Dump a cProfile file per stage in this directory")
+    parser.add_argument("--timings-json", help="Write per-stage measurements to this file")
+    parser.add_argument(
+        "-W", "--watch", action="store_true", help="Regenerate configs on intent edits"
+    )
     args = parser.parse_args()
 
     if args.help:
         print_help()
         exit(0)
 
+    # Deltas and watch-mode partial updates compare and replace single files
+    if args.output_format != "dir":
+        if args.delta:
+            parser.error(f"-D/--delta needs the 'dir' output format, not '{args.output_format}'")
+        if args.watch:
+            parser.error(f"-W/--watch needs the 'dir' output format, not '{args.output_format}'")
+
     file_path: str = args.file
     verbose: bool = args.verbose
     dry_run: bool = args.dry_run
     project_name: str = args.project_name
+    jobs: int = args.jobs
+    as_jobs: int = args.as_jobs
+    force: bool = args.force
+    workers: int = args.workers
+    gns3_url: str = args.gns3_url
+    gns3_project: str = args.gns3_project
+    build_topology: bool = args.build_topology
+    live: bool = args.live
+    stream: bool = args.stream
+    check_only: bool = args.check
+    verify: bool = args.verify
+    use_cache: bool = not args.no_cache
+    output_format: str = args.output_format
+    delta: bool = args.delta
+    timings_json: str = args.timings_json
+    profiler = StageProfiler(args.timings or timings_json is not None, args.profile)
+
+    if args.watch:
+        from src.watch import Watcher
 
-    # Load YAML configuration
-    with open(file_path, "r") as f:
-        config_data = yaml.safe_load(f)
-    
-    first_key = list(config_data.keys())[0]
-    
-    if ((type(first_key) == str) and (first_key.lower() == "ass")):
-        config_data = config_data[first_key]
+        # Only the configs affected by each edit are rewritten. After each
+        # update, every node whose startup config differs is exported
+        on_written = None
+        if project_name is not None:
+            from src.config_to_gns3 import export_config
+
+            on_written = lambda written: export_config(
+                verbose,
+                project_name,
+                None,
+                workers,
+                gns3_url,
+                output_path(OUTPUT_DIR, output_format),
+                live,
+            )
+        Watcher(file_path, verbose, jobs, output_format, on_written, use_cache).run()
+        exit(0)
+
+    # Load YAML configuration (or its cached parsed copy)
+    with profiler.stage("load"):
+        config_data = load_intent(file_path, use_cache)
+
+    # Pre-flight validation: every problem of the intent is reported at once.
+    # It also builds the link graph (both ends of every link), shared by the steps
+    with profiler.stage("validate"):
+        try:
+            links = check_intent(config_data)
+            # GNS3 labs: every interface must map to a port of the c7200
+            if gns3_project is not None or (project_name is not None and build_topology):
+                from src.gns3_project import check_ports
+
+                check_ports(config_data)
+        except ValueError as e:
+            print(f"[!] {file_path}: {e}")
+            exit(1)
+
+    if check_only:
+        print(f"[+] {file_path}: intent valide")
+        exit(0)
 
     # Start pipeline
     # Step 1 : Assign networks to interfaces without addresses
@@ -79,17 +255,100 @@ if __name__ == "__main__":
     # Step 4 : Configure IGP (OSPF or iBGP, RIP doesn't need any extra work)
     # Step 5 : Write config files for each router
 
-    step1(config_data, verbose)  # Pass empty list, step2 modifies config_data
-    routers = step2(config_data, verbose)
-    routers = step3(config_data, routers, verbose)
-    routers = step4_ospf(config_data, routers, verbose)
-    routers = step4_ibgp(config_data, routers, verbose)
+    # Links keep the subnets of the last written output (also with --dry-run,
+    # which shows the addresses a real run would write)
+    subnets = read_subnets(OUTPUT_DIR)
+
+    if stream:
+        # Steps 1 to 4 as a generator, consumed by step 5
+        routers = stream_routers(config_data, verbose, links, subnets)
+    elif as_jobs is not None:
+        with profiler.stage("step1"):
+            step1(config_data, verbose, links, subnets)
+        # Steps 2 to 4, ASes spread over a process pool
+        with profiler.stage("step2-4"):
+            routers = resolve_parallel(config_data, as_jobs, verbose, links)
+    else:
+        with profiler.stage("step1"):
+            step1(config_data, verbose, links, subnets)  # Pass empty list, step2 modifies config_data
+        with profiler.stage("step2"):
+            routers = step2(config_data, verbose)
+        with profiler.stage("step3"):
+            routers = step3(config_data, routers, verbose, links=links)
+        with profiler.stage("step4_ospf"):
+            routers = step4_ospf(config_data, routers, verbose, links=links)
+        with profiler.stage("step4_ibgp"):
+            routers = step4_ibgp(config_data, routers, verbose, links=links)
+
+    # Offline routing simulation: nothing is written or exported when a
+    # loopback can't reach another one (needs every router, even with -s)
+    if verify:
+        with profiler.stage("verify"):
+            routers = list(routers)
+            simulation = simulate_routing(routers, verbose)
+        simulation.report(verbose)
+        if not simulation.ok:
+            if profiler.enabled:
+                profiler.report()
+            if timings_json is not None:
+                profiler.write_json(timings_json)
+            exit(1)
 
     # Step 5 : only if --dry-run flag is unset
+    # (in streaming mode steps 1 to 4 are measured with this stage)
     if not dry_run:
-        ecriture_config(routers, verbose)
+        with profiler.stage("stream" if stream else "ecriture_config"):
+            from src.ecriture import ecriture_config
+
+            ecriture_config(
+                routers, verbose, jobs, force, output_format=output_format, delta=delta
+            )
+            write_subnets(OUTPUT_DIR, subnets)
         if project_name is not None :
-            export_config(verbose,project_name)
+            if build_topology:
+                # Nodes and links missing from the project
+                with profiler.stage("build_topology"):
+                    from src.config_to_gns3 import build_topology as build
+
+                    build(verbose, project_name, config_data, links, workers, gns3_url)
+            # Every node is compared with its startup config (by hash): only
+            # the nodes whose config differs are pushed and restarted, even
+            # when the configs were written by an earlier run or the previous
+            # export failed
+            with profiler.stage("export_config"):
+                from src.config_to_gns3 import export_config
+
+                export_config(
+                    verbose,
+                    project_name,
+                    None,
+                    workers,
+                    gns3_url,
+                    output_path(OUTPUT_DIR, output_format),
+                    live,
+                )
+        if gns3_project is not None:
+            # Offline project: nodes and links from the intent, configs from step 5
+            with profiler.stage("gns3_project"):
+                from src.gns3_project import write_project
+
+                write_project(
+                    config_data,
+                    gns3_project,
+                    output_path(OUTPUT_DIR, output_format),
+                    verbose,
+                    links,
+                )
+
+    if dry_run and stream:
+        with profiler.stage("stream"):
+            for router in routers:
+                if not verbose:
+                    pprint(router.template_context())
+    elif dry_run and not verbose:
+        pprint([router.template_context() for router in routers])
 
-    if dry_run and not verbose:
-        pprint(routers)
\ No newline at end of file
+    if profiler.enabled:
+        profiler.report()
+    if timings_json is not None:
+        profiler.write_json(timings_json)
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import bisect
+import ipaddress
+import json
+import os
+import socket
+
+SUBNET_PREFIX = 126
+SUBNET_SIZE = 2 ** (128 - SUBNET_PREFIX)
+# Subnets of the links in the last written output (link key -> subnet), kept
+# next to the manifest so that step1 gives every link the same subnet again
+SUBNETS_NAME = ".subnets.json"
+
+
+# Allocates /126 link subnets with integer arithmetic.
+# Subnets are handed out first-fit from the start of each pool, skipping the
+# reserved ranges (user configured addresses, loopback spaces) and the
+# subnets already taken. First-fit alone isn't stable (a new link shifts the
+# links allocated after it): step1 keeps the subnets of the previous run
+# (keep) before allocating the new links.
+class SubnetAllocator:
+    def __init__(self):
+        self.pools = {}  # name -> (network address, last address)
+        self.cursors = {}  # name -> first address not checked by allocate yet
+        self.reserved = []  # Reserved (start, end) intervals, merged lazily
+        self.starts = []  # Sorted and merged reserved intervals
+        self.ends = []
+        self.allocated = set()  # Network addresses of allocated subnets
+
+    def add_pool(self, name, networks_space: str):
+        network = ipaddress.IPv6Network(networks_space)
+        if network.prefixlen > SUBNET_PREFIX:
+            raise ValueError(
+                f"networks_space '{networks_space}' is smaller than a /{SUBNET_PREFIX}"
+            )
+        self.pools[name] = (int(network.network_address), int(network.broadcast_address))
+        self.cursors[name] = int(network.network_address)
+
+    def capacity(self, name) -> int:
+        base, last = self.pools[name]
+        return (last - base + 1) // SUBNET_SIZE
+
+    # Reserve the whole network of an address ("2001::1/64" reserves the /64)
+    def reserve(self, address: str):
+        network = ipaddress.IPv6Interface(address).network
+        self.reserved.append(
+            (int(network.network_address), int(network.broadcast_address))
+        )
+
+    def is_reserved(self, start: int, end: int) -> bool:
+        if self.reserved:
+            self.__merge__()
+        i = bisect.bisect_right(self.starts, end) - 1
+        return i >= 0 and self.ends[i] >= start
+
+    def __merge__(self):
+        intervals = sorted(self.reserved + list(zip(self.starts, self.ends)))
+        self.reserved = []
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            if self.ends and start <= self.ends[-1] + 1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    # Take the subnet starting at `start` (a /126 of `pool`), returns False
+    # when it is outside the pool, reserved or already allocated
+    def keep(self, pool, start: int) -> bool:
+        base, last = self.pools[pool]
+        if start < base or start + SUBNET_SIZE - 1 > last or start % SUBNET_SIZE:
+            return False
+        if start in self.allocated or self.is_reserved(start, start + SUBNET_SIZE - 1):
+            return False
+        self.allocated.add(start)
+        return True
+
+    # Network address (as an int) of the first free /126 of `pool`
+    def allocate(self, pool) -> int:
+        last = self.pools[pool][1]
+        start = self.cursors[pool]
+        while start + SUBNET_SIZE - 1 <= last:
+            end = start + SUBNET_SIZE - 1
+            if self.is_reserved(start, end):
+                # Jump over the whole reserved range, to the next /126
+                i = bisect.bisect_right(self.starts, end) - 1
+                start = -(-(self.ends[i] + 1) // SUBNET_SIZE) * SUBNET_SIZE
+            elif start in self.allocated:
+                start += SUBNET_SIZE
+            else:
+                self.allocated.add(start)
+                self.cursors[pool] = start + SUBNET_SIZE
+                return start
+
+        raise ValueError(f"No /{SUBNET_PREFIX} subnet left in pool {pool}")
+
+
+# Number of /126 subnets the allocator can hand out from a network
+def pool_capacity(network: ipaddress.IPv6Network) -> int:
+    return network.num_addresses // SUBNET_SIZE
+
+
+def read_subnets(output_dir: str) -> dict:
+    try:
+        with open(os.path.join(output_dir, SUBNETS_NAME), "r") as f:
+            subnets = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return subnets if isinstance(subnets, dict) else {}
+
+
+def write_subnets(output_dir: str, subnets: dict):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, SUBNETS_NAME), "w") as f:
+        json.dump(subnets, f, indent=1, sort_keys=True)
+
+
+# Compressed text form of an address, inet_ntop is much faster than ipaddress
+# but writes addresses starting with 80 zero bits in dotted IPv4 form
+def format_address(address: int) -> str:
+    if address >> 48 == 0:
+        return str(ipaddress.IPv6Address(address))
+    return socket.inet_ntop(socket.AF_INET6, address.to_bytes(16, "big"))
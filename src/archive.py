@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import tarfile
+import zipfile
+
+# Output directory of ecriture_config (configs, manifest, link subnets)
+OUTPUT_DIR = "output"
+# Output formats of ecriture_config: one .cfg file per router ("dir"), or
+# every config in a single archive written in one buffered stream
+OUTPUT_FORMATS = ["dir", "tar", "zip", "jsonl"]
+ARCHIVE_NAMES = {
+    "tar": "configs.tar",
+    "zip": "configs.zip",
+    "jsonl": "configs.jsonl",
+}
+BUFFER_SIZE = 1 << 20
+
+
+# Path written by ecriture_config for a format (the directory itself for "dir")
+def output_path(output_dir: str, output_format: str) -> str:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Invalid output format '{output_format}', expected one of {OUTPUT_FORMATS}"
+        )
+    if output_format == "dir":
+        return output_dir
+    return os.path.join(output_dir, ARCHIVE_NAMES[output_format])
+
+
+# Writes configs to a temporary file, moved over the archive on close so that
+# a reader (export_config) never sees a partial archive
+class ArchiveWriter:
+    def __init__(self, path: str, output_format: str):
+        self.path = path
+        self.output_format = output_format
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "wb", buffering=BUFFER_SIZE)
+        self.archive = None
+        if output_format == "tar":
+            self.archive = tarfile.open(fileobj=self.file, mode="w")
+        elif output_format == "zip":
+            self.archive = zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED)
+
+    # `name` is the router name, the config is stored as `name`.cfg
+    def add(self, name: str, config: str):
+        content = config.encode()
+        if self.output_format == "tar":
+            info = tarfile.TarInfo(f"{name}.cfg")
+            info.size = len(content)
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(content))
+        elif self.output_format == "zip":
+            self.archive.writestr(f"{name}.cfg", content)
+        else:
+            line = json.dumps({"name": name, "config": config}) + "\n"
+            self.file.write(line.encode())
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# {router name: config bytes} read from a .tar, .zip or .jsonl archive,
+# restricted to `names` if given
+def read_configs(path: str, names=None) -> dict:
+    configs = {}
+
+    if path.endswith(".jsonl"):
+        with open(path, "rb", buffering=BUFFER_SIZE) as f:
+            for line in f:
+                entry = json.loads(line)
+                if names is None or entry["name"] in names:
+                    configs[entry["name"]] = entry["config"].encode()
+    elif path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                name = member.removesuffix(".cfg")
+                if names is None or name in names:
+                    configs[name] = archive.read(member)
+    elif path.endswith(".tar"):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                name = member.name.removesuffix(".cfg")
+                if member.isfile() and (names is None or name in names):
+                    configs[name] = archive.extractfile(member).read()
+    else:
+        raise ValueError(f"Unknown config archive format: {path}")
+
+    return configs
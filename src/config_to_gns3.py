@@ -1,76 +1,407 @@
-import os
-from gns3fy import Gns3Connector, Project
-
-def export_config(verbose,project_name):
-    # ==============================
-    # PARAMÈTRES
-    # ==============================
-    GNS3_URL = "http://localhost:3080"
-    PROJECT_NAME = project_name
-    CONFIG_DIR = "output"
-
-
-    # ==============================
-    # CONNEXION GNS3
-    # ==============================
-    gns3 = Gns3Connector(url=GNS3_URL)
-    project = Project(name=PROJECT_NAME, connector=gns3)
-    project.get()
-
-    if verbose:
-        print(f"[+] Connecté au projet : {project.name}")
-
-    # ==============================
-    # RÉCUPÉRATION DES NODES
-    # ==============================
-    project.get_nodes()
-
-    # ==============================
-    # INJECTION DES STARTUP CONFIGS + DÉMARRAGE
-    # ==============================
-    
-    for node in project.nodes:
-        if node.node_type not in ["dynamips", "qemu"]:
-            continue
-
-        cfg_path = os.path.join(CONFIG_DIR, f"{node.name}.cfg")
-        if not os.path.isfile(cfg_path):
-            print(f"[-] Aucun fichier de config pour {node.name}")
-            continue
-
-        try:
-            # Lire la nouvelle config
-            with open(cfg_path, "r", encoding="utf-8") as f:
-                config_data = f.read()
-
-            # Chemin vers le dossier configs du node
-            configs_dir = os.path.join(node.node_directory, "configs")
-            os.makedirs(configs_dir, exist_ok=True)
-
-            # Vérifier s'il y a déjà un fichier dans ce dossier
-            existing_files = [f for f in os.listdir(configs_dir) if os.path.isfile(os.path.join(configs_dir, f))]
-            if existing_files:
-                # On prend le premier fichier existant et on le remplace
-                target_file = os.path.join(configs_dir, existing_files[0])
-            else:
-                # Sinon, créer un fichier par défaut "startup-config"
-                target_file = os.path.join(configs_dir, "startup-config")
-
-            # Écrire la nouvelle config
-            with open(target_file, "w", encoding="utf-8") as f:
-                f.write(config_data)
-
-            if verbose:
-                print(f"[+] Config remplacée pour {node.name} dans {target_file}")
-
-            # Démarrage du node
-            if verbose:
-                print(f"[+] Redémarrage du routeur {node.name}")
-            node.stop()
-            node.start()
-
-        except Exception as e:
-            print(f"[!] Erreur sur {node.name} : {e}")
-
-    if verbose:
-        print("[+] Tous les routeurs sont traités")
\ No newline at end of file
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from gns3fy import Gns3Connector, Project
+from requests.adapters import HTTPAdapter
+
+try:
+    from src.archive import read_configs
+    from src.console import push_configs
+    from src.delta import config_delta
+    from src.gns3_project import check_ports, interface_port, node_layout
+    from src.links import as_link_graph
+except ImportError:  # Run as a script from src/
+    from archive import read_configs
+    from console import push_configs
+    from delta import config_delta
+    from gns3_project import check_ports, interface_port, node_layout
+    from links import as_link_graph
+
+GNS3_URL = "http://localhost:3080"
+CONFIG_DIR = "output"
+
+# Evite que les messages des workers se mélangent
+__print_lock__ = threading.Lock()
+
+
+# node_names : si renseigné, seuls ces routeurs sont mis à jour et redémarrés
+# workers : nombre de routeurs traités en parallèle
+# config_source : dossier des .cfg ou archive (.tar, .zip, .jsonl) écrite par ecriture_config
+# live : config appliquée par la console des routeurs démarrés (voir console.py)
+# au lieu d'un redémarrage
+def export_config(verbose,project_name,node_names=None,workers=1,gns3_url=GNS3_URL,config_source=CONFIG_DIR,live=False):
+    # ==============================
+    # PARAMÈTRES
+    # ==============================
+    PROJECT_NAME = project_name
+    workers = max(1, workers)
+
+
+    # ==============================
+    # CONNEXION GNS3
+    # ==============================
+    project = __connect__(verbose, PROJECT_NAME, workers, gns3_url)
+
+    # ==============================
+    # RÉCUPÉRATION DES NODES (une seule requête)
+    # ==============================
+    project.get_nodes()
+
+    # ==============================
+    # INJECTION DES STARTUP CONFIGS + DÉMARRAGE
+    # ==============================
+    nodes = []
+    results = []
+    for node in project.nodes:
+        if node.node_type not in ["dynamips", "qemu"]:
+            continue
+
+        if node_names is not None and node.name not in node_names:
+            if verbose:
+                print(f"[=] Config inchangée pour {node.name}")
+            results.append((node.name, "skipped", 0.0))
+            continue
+
+        nodes.append(node)
+
+    # Archive : une seule lecture pour toutes les configs à exporter
+    configs = None
+    if not os.path.isdir(config_source):
+        configs = read_configs(config_source, {node.name for node in nodes})
+        if verbose:
+            print(f"[+] {len(configs)} config(s) lue(s) depuis {config_source}")
+
+    start = time.perf_counter()
+    if live:
+        results += __push_nodes__(nodes, verbose, config_source, configs, gns3_url)
+    elif workers > 1 and len(nodes) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results += pool.map(
+                lambda n: __export_node__(n, verbose, config_source, configs), nodes
+            )
+    else:
+        results += [
+            __export_node__(node, verbose, config_source, configs) for node in nodes
+        ]
+    total = time.perf_counter() - start
+
+    if verbose:
+        for name, status, duration in results:
+            print(f"[t] {name} : {status} en {duration:.2f}s")
+        print(f"[+] Tous les routeurs sont traités ({len(results)} en {total:.2f}s)")
+
+    # Résumé
+    counts = {"written": 0, "skipped": 0, "failed": 0}
+    for _, status, _ in results:
+        counts[status] += 1
+    print(
+        f"[=] {counts['written']} config(s) écrite(s), {counts['skipped']} ignorée(s), {counts['failed']} en échec"
+    )
+
+    return results
+
+
+# Crée dans le projet les routeurs et les liens de l'intention qui n'existent
+# pas encore (nodes dynamips c7200, voir gns3_project.py), en comparant avec
+# les nodes et liens existants : une seconde exécution ne crée rien.
+# Les appels API sont répartis sur `workers` threads (nodes puis liens).
+# Renvoie les noms des nodes créés (à exporter même si leur config n'a pas changé)
+def build_topology(verbose, project_name, data, links=None, workers=1, gns3_url=GNS3_URL):
+    check_ports(data)
+    links = as_link_graph(data, links)
+    workers = max(1, workers)
+    project = __connect__(verbose, project_name, workers, gns3_url)
+    connector = project.connector
+    base_url = f"{connector.base_url}/projects/{project.project_id}"
+
+    # Etat actuel du projet (une requête pour les nodes, une pour les liens)
+    project.get_nodes()
+    project.get_links()
+    node_ids = {}
+    # Nom d'un routeur déjà pris par un autre type de node (VPCS, switch...) :
+    # signalé, ni créé ni relié
+    conflicts = {}
+    for node in project.nodes:
+        if node.node_type == "dynamips":
+            node_ids[node.name] = node.node_id
+        else:
+            conflicts[node.name] = node.node_type
+
+    # ==============================
+    # NODES MANQUANTS
+    # ==============================
+    def create_node(item):
+        hostname, (x, y), properties = item
+        name = hostname.split(":")[1]
+        body = {
+            "name": name,
+            "node_type": "dynamips",
+            "compute_id": "local",
+            "symbol": ":/symbols/router.svg",
+            "x": x,
+            "y": y,
+            "properties": properties,
+        }
+        try:
+            response = connector.http_call("post", f"{base_url}/nodes", json_data=body)
+        except Exception as e:
+            __log__(f"[!] Erreur à la création de {name} : {e}")
+            return name, None
+        if verbose:
+            __log__(f"[+] Node créé : {name}")
+        return name, response.json()["node_id"]
+
+    missing_nodes = []
+    failed = 0
+    for item in node_layout(data):
+        name = item[0].split(":")[1]
+        if name in conflicts:
+            __log__(f"[!] Le nom {name} est déjà utilisé par un node {conflicts[name]}")
+            failed += 1
+        elif name not in node_ids:
+            missing_nodes.append(item)
+    created = []
+    for name, node_id in __run__(create_node, missing_nodes, workers):
+        if node_id is None:
+            failed += 1
+        else:
+            node_ids[name] = node_id
+            created.append(name)
+
+    # ==============================
+    # LIENS MANQUANTS
+    # ==============================
+    # Un lien existe déjà s'il relie les mêmes ports, un port déjà utilisé
+    # par un autre lien n'est pas modifié
+    existing = set()
+    used_ports = set()
+    for link in project.links:
+        ends = frozenset(
+            (end["node_id"], end["adapter_number"], end["port_number"])
+            for end in link.nodes or []
+        )
+        existing.add(ends)
+        used_ports.update(ends)
+
+    missing_links = []
+    present = 0
+    for a, b in links.links:
+        ends = []
+        for hostname, ifname, _ in (a, b):
+            _, adapter, port = interface_port(hostname, ifname)
+            ends.append((node_ids.get(hostname.split(":")[1]), adapter, port))
+        if frozenset(ends) in existing:
+            present += 1
+            continue
+        if None in (ends[0][0], ends[1][0]):  # Node non créé, déjà signalé
+            failed += 1
+            continue
+        if used_ports.intersection(ends):
+            __log__(f"[!] {a[0]}:{a[1]} - {b[0]}:{b[1]} : port déjà relié à un autre node")
+            failed += 1
+            continue
+        missing_links.append((f"{a[0]}:{a[1]} - {b[0]}:{b[1]}", ends))
+
+    def create_link(item):
+        where, ends = item
+        body = {
+            "nodes": [
+                {"node_id": node_id, "adapter_number": adapter, "port_number": port}
+                for node_id, adapter, port in ends
+            ]
+        }
+        try:
+            connector.http_call("post", f"{base_url}/links", json_data=body)
+        except Exception as e:
+            __log__(f"[!] Erreur à la création du lien {where} : {e}")
+            return False
+        if verbose:
+            __log__(f"[+] Lien créé : {where}")
+        return True
+
+    results = list(__run__(create_link, missing_links, workers))
+    failed += results.count(False)
+
+    print(
+        f"[=] {len(created)} node(s) et {results.count(True)} lien(s) créé(s), "
+        f"{present} lien(s) déjà présent(s), {failed} en échec"
+    )
+    return created
+
+
+def __connect__(verbose, project_name, workers, gns3_url) -> Project:
+    gns3 = Gns3Connector(url=gns3_url)
+    # Une connexion HTTP réutilisable par worker
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    gns3.session.mount("http://", adapter)
+    gns3.session.mount("https://", adapter)
+
+    project = Project(name=project_name, connector=gns3)
+    project.get(get_links=False, get_nodes=False, get_stats=False)
+
+    if verbose:
+        print(f"[+] Connecté au projet : {project.name}")
+    return project
+
+
+# `function` appliquée à chaque élément, sur `workers` threads si besoin
+def __run__(function, items, workers):
+    if workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(function, items))
+    return [function(item) for item in items]
+
+
+# Remplace la startup config d'un node et le redémarre
+# Renvoie (nom du node, statut, durée en secondes)
+# configs : configs déjà lues depuis une archive, sinon lecture dans config_dir
+def __export_node__(node, verbose, config_dir=CONFIG_DIR, configs=None) -> tuple:
+    start = time.perf_counter()
+
+    config_data = __node_config__(node, config_dir, configs)
+    if config_data is None:
+        __log__(f"[-] Aucun fichier de config pour {node.name}")
+        return node.name, "skipped", time.perf_counter() - start
+
+    previous = False  # Contenu remplacé (None : pas de fichier)
+    try:
+
+        target_file = __startup_config_file__(node)
+
+        # Config identique : pas besoin de réécrire ni de redémarrer le node
+        if __same_content__(target_file, config_data):
+            if verbose:
+                __log__(f"[=] Config identique pour {node.name}, pas de redémarrage")
+            return node.name, "skipped", time.perf_counter() - start
+
+        # Écrire la nouvelle config (l'ancienne est gardée en cas d'échec)
+        previous = None
+        if os.path.isfile(target_file):
+            with open(target_file, "rb") as f:
+                previous = f.read()
+        with open(target_file, "wb") as f:
+            f.write(config_data)
+
+        if verbose:
+            __log__(f"[+] Config remplacée pour {node.name} dans {target_file}")
+
+        # Démarrage du node
+        if verbose:
+            __log__(f"[+] Redémarrage du routeur {node.name}")
+        node.stop()
+        node.start()
+
+    except Exception as e:
+        __log__(f"[!] Erreur sur {node.name} : {e}")
+        # Ancienne config remise : le node sera de nouveau exporté la fois suivante
+        if previous is not False:
+            try:
+                if previous is None:
+                    os.remove(target_file)
+                else:
+                    with open(target_file, "wb") as f:
+                        f.write(previous)
+            except OSError:
+                pass
+        return node.name, "failed", time.perf_counter() - start
+
+    return node.name, "written", time.perf_counter() - start
+
+
+# Applique les configs par la console des routeurs, sans redémarrage : seules
+# les commandes qui diffèrent de la startup config actuelle du node sont
+# envoyées (voir delta.py), puis `write memory`. La startup config du node est ensuite
+# remplacée pour les routeurs mis à jour (référence du prochain diff)
+def __push_nodes__(nodes, verbose, config_dir, configs, gns3_url) -> list:
+    results = []
+    targets = []
+    files = {}
+    for node in nodes:
+        config_data = __node_config__(node, config_dir, configs)
+        if config_data is None:
+            __log__(f"[-] Aucun fichier de config pour {node.name}")
+            results.append((node.name, "skipped", 0.0))
+            continue
+
+        try:
+            target_file = __startup_config_file__(node)
+            if __same_content__(target_file, config_data):
+                if verbose:
+                    __log__(f"[=] Config identique pour {node.name}")
+                results.append((node.name, "skipped", 0.0))
+                continue
+
+            previous = None
+            if os.path.isfile(target_file):
+                with open(target_file, "rb") as f:
+                    previous = f.read().decode(errors="replace")
+        except OSError as e:
+            __log__(f"[!] Erreur sur {node.name} : {e}")
+            results.append((node.name, "failed", 0.0))
+            continue
+
+        # Console ouverte sur toutes les adresses : celle du serveur GNS3
+        host = node.console_host
+        if host in (None, "", "0.0.0.0", "::"):
+            host = urlparse(gns3_url).hostname
+        commands = config_delta(previous, config_data.decode())
+        targets.append((node.name, host, node.console, commands))
+        files[node.name] = (target_file, config_data)
+
+    if verbose:
+        print(f"[+] Envoi de {len(targets)} config(s) par les consoles")
+
+    for name, status, duration, message in push_configs(targets, verbose):
+        if status == "written":
+            target_file, config_data = files[name]
+            with open(target_file, "wb") as f:
+                f.write(config_data)
+        else:
+            __log__(f"[!] Erreur sur {name} : {message}")
+        results.append((name, status, duration))
+    return results
+
+
+# Nouvelle config du node, depuis les configs lues dans une archive ou
+# depuis le dossier config_dir (None si elle n'existe pas)
+def __node_config__(node, config_dir, configs):
+    if configs is not None:
+        return configs.get(node.name)
+    cfg_path = os.path.join(config_dir, f"{node.name}.cfg")
+    if not os.path.isfile(cfg_path):
+        return None
+    # Lire la nouvelle config
+    with open(cfg_path, "rb") as f:
+        return f.read()
+
+
+# Fichier de startup config du node
+def __startup_config_file__(node) -> str:
+    # Chemin vers le dossier configs du node
+    configs_dir = os.path.join(node.node_directory, "configs")
+    os.makedirs(configs_dir, exist_ok=True)
+
+    # Vérifier s'il y a déjà un fichier dans ce dossier
+    existing_files = [f for f in os.listdir(configs_dir) if os.path.isfile(os.path.join(configs_dir, f))]
+    if existing_files:
+        # On prend le premier fichier existant et on le remplace
+        return os.path.join(configs_dir, existing_files[0])
+    # Sinon, créer un fichier par défaut "startup-config"
+    return os.path.join(configs_dir, "startup-config")
+
+
+# Compare le fichier existant (par hash) avec la nouvelle config
+def __same_content__(path: str, content: bytes) -> bool:
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        existing = hashlib.sha256(f.read()).digest()
+    return existing == hashlib.sha256(content).digest()
+
+
+def __log__(message: str):
+    with __print_lock__:
+        print(message)
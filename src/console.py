@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import asyncio
+import re
+import time
+from pprint import pprint
+
+# Concurrent console sessions (a session mostly waits for the router)
+CONSOLE_SESSIONS = 64
+TIMEOUT = 30.0  # seconds, for every prompt
+# Attempts to get a prompt while the router is still booting
+WAKE_ATTEMPTS = 10
+
+# Telnet negotiation (RFC 854)
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+ECHO, SUPPRESS_GO_AHEAD = 1, 3
+
+PROMPT_RE = re.compile(rb"[\w.-]+(\([\w-]*\))?[>#] ?$")
+CONFIG_PROMPT_RE = re.compile(rb"\(config[\w-]*\)# ?$")
+DIALOG_RE = re.compile(rb"\[yes/no\]: ?$")
+OK_RE = re.compile(rb"\[OK\]")
+ERROR_RE = re.compile(rb"^% (Invalid|Incomplete|Ambiguous).*$", re.MULTILINE)
+
+
+# Pushes the commands of every target over its console, with at most
+# `sessions` consoles open at once. targets: [(name, host, port, commands)]
+# Returns [(name, status, duration in seconds, message)] in the targets' order,
+# status being "written" (applied and saved with write memory) or "failed"
+def push_configs(targets: list, verbose=False, sessions=CONSOLE_SESSIONS, timeout=TIMEOUT) -> list:
+    if not targets:
+        return []
+    return asyncio.run(__push_all__(targets, verbose, max(1, sessions), timeout))
+
+
+async def __push_all__(targets, verbose, sessions, timeout) -> list:
+    semaphore = asyncio.Semaphore(sessions)
+
+    async def push(target):
+        async with semaphore:
+            return await __push__(*target, verbose, timeout)
+
+    return await asyncio.gather(*(push(target) for target in targets))
+
+
+async def __push__(name, host, port, commands, verbose, timeout) -> tuple:
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        return name, "failed", time.perf_counter() - start, f"console {host}:{port}: {e or 'timeout'}"
+
+    session = ConsoleSession(reader, writer, timeout)
+    try:
+        await session.enable()
+        await session.command("configure terminal", CONFIG_PROMPT_RE)
+        errors = []
+        for command in commands:
+            errors += await session.command(command)
+        await session.command("end", PROMPT_RE)
+        await session.command("write memory", OK_RE)
+        await session.expect(PROMPT_RE)
+    except (OSError, asyncio.TimeoutError, EOFError) as e:
+        return name, "failed", time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    finally:
+        writer.close()
+
+    if verbose:
+        print(f"[+] {len(commands)} commande(s) appliquée(s) sur {name}")
+    if errors:
+        return name, "failed", time.perf_counter() - start, f"{len(errors)} commande(s) refusée(s) : {errors[0]}"
+    return name, "written", time.perf_counter() - start, ""
+
+
+# Telnet console of an IOS router: strips the telnet negotiation from the
+# stream (answering it) and waits for prompts
+class ConsoleSession:
+    def __init__(self, reader, writer, timeout=TIMEOUT):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.buffer = b""
+        self.pending = b""  # Incomplete telnet command at the end of a read
+
+    # Gets to the privileged EXEC prompt (Router#)
+    async def enable(self):
+        patterns = [PROMPT_RE, DIALOG_RE]
+        unanswered = 0
+        for _ in range(WAKE_ATTEMPTS):
+            self.send("")
+            try:
+                output = await self.expect(patterns, min(self.timeout, 3.0))
+            except asyncio.TimeoutError:
+                unanswered += 1  # Still booting
+                continue
+            if DIALOG_RE.search(output):
+                self.send("no")
+            elif CONFIG_PROMPT_RE.search(output):
+                self.send("end")
+            elif output.rstrip().endswith(b">"):
+                self.send("enable")
+            else:
+                # The empty lines sent during the boot may still get prompts
+                if unanswered:
+                    await self.drain()
+                return
+        raise asyncio.TimeoutError("no prompt on the console")
+
+    # Sends a command and waits for the next prompt, returns the error lines
+    async def command(self, command: str, pattern=PROMPT_RE) -> list:
+        self.send(command)
+        output = await self.expect(pattern)
+        return [
+            f"{command} ({m.group(0).decode('latin-1').strip()})"
+            for m in ERROR_RE.finditer(output)
+        ]
+
+    # Drops whatever the router sends until it is quiet for `quiet` seconds
+    async def drain(self, quiet: float = 0.5):
+        try:
+            while True:
+                data = await asyncio.wait_for(self.reader.read(4096), quiet)
+                if not data:
+                    raise EOFError("console closed")
+                self.__negotiate__(data)
+        except asyncio.TimeoutError:
+            self.buffer = b""
+
+    def send(self, line: str):
+        self.writer.write(line.encode("latin-1") + b"\r")
+
+    # Reads until one of `patterns` matches the end of the output,
+    # returns (and consumes) the output read so far
+    async def expect(self, patterns, timeout=None) -> bytes:
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        deadline = asyncio.get_running_loop().time() + (timeout or self.timeout)
+        while True:
+            text = self.buffer.rstrip(b"\r\n")
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match:
+                    output, self.buffer = self.buffer[: match.end()], self.buffer[match.end():]
+                    return output
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"no {patterns[0].pattern!r} prompt")
+            data = await asyncio.wait_for(self.reader.read(4096), remaining)
+            if not data:
+                raise EOFError("console closed")
+            self.buffer += self.__negotiate__(data)
+
+    # Removes the telnet commands from `data` and answers them: the router
+    # may echo and suppress go-ahead, we refuse every other option
+    def __negotiate__(self, data: bytes) -> bytes:
+        data = self.pending + data
+        self.pending = b""
+        text = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                text.append(byte)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self.pending = data[i:]
+                break
+            command = data[i + 1]
+            if command == IAC:  # Escaped 255
+                text.append(IAC)
+                i += 2
+            elif command in (WILL, WONT, DO, DONT):
+                if i + 2 >= len(data):
+                    self.pending = data[i:]
+                    break
+                option = data[i + 2]
+                if command == WILL:
+                    answer = DO if option in (ECHO, SUPPRESS_GO_AHEAD) else DONT
+                    self.writer.write(bytes([IAC, answer, option]))
+                elif command == DO:
+                    self.writer.write(bytes([IAC, WONT, option]))
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                if end < 0:
+                    self.pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(text)
+
+
+def main():
+    from delta import config_delta
+
+    with open("output/R1.cfg") as f:
+        commands = config_delta(None, f.read())
+    return push_configs([("R1", "127.0.0.1", 5000, commands)], True)
+
+
+if __name__ == "__main__":
+    pprint(main())
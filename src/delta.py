@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+from pprint import pprint
+
+# Lines of a rendered config that aren't configuration commands
+SKIPPED = {"end", "version", "boot-start-marker", "boot-end-marker"}
+# Commands leaving a block (written by the template after address families)
+EXITS = {"exit", "exit-address-family"}
+
+
+# Tree of an IOS config: [(command, children)], children being the commands
+# indented below it (interface, ipv6 router ospf, router bgp and its
+# address-family blocks...). Comments, blank lines and exits are dropped.
+def parse_config(config: str) -> list:
+    root = []
+    stack = [(-1, root)]  # (indentation, children) of the open blocks
+    for line in config.splitlines():
+        command = line.strip()
+        if not command or command.startswith("!") or command in EXITS:
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        if indent == 0 and command.split()[0] in SKIPPED:
+            continue
+        while stack[-1][0] >= indent:
+            stack.pop()
+        children = []
+        stack[-1][1].append((command, children))
+        stack.append((indent, children))
+    return root
+
+
+# Minimal commands (configuration mode) turning the `previous` config into
+# `config`. Removed commands are negated first (deepest blocks first, so a
+# neighbour is deactivated before being removed), then the new commands are
+# added in the order of the new config. A block is only entered when
+# something changes in it. Removed blocks are negated as a whole
+# (`default interface` for interfaces). Without `previous`, the whole config.
+def config_delta(previous: str, config: str) -> list:
+    old = parse_config(previous or "")
+    new = parse_config(config)
+    return __removals__(old, new, 0) + __additions__(old, new, 0)
+
+
+# Changes inside the kept blocks come before the commands of this level
+def __removals__(old: list, new: list, depth: int) -> list:
+    new_blocks = dict(new)
+    indent = " " * depth
+    nested = []
+    commands = []
+    for command, children in old:
+        if command not in new_blocks:
+            commands.append(indent + __negate__(command))
+            continue
+        if children:
+            inner = __removals__(children, new_blocks[command], depth + 1)
+            if inner:
+                nested += [indent + command, *inner]
+                if depth:
+                    nested.append(f"{indent} exit")
+    return nested + commands
+
+
+def __additions__(old: list, new: list, depth: int) -> list:
+    old_blocks = dict(old)
+    commands = []
+    indent = " " * depth
+    for command, children in new:
+        if command not in old_blocks:
+            inner = __additions__([], children, depth + 1)
+            commands.append(indent + command)
+        elif children:
+            inner = __additions__(old_blocks[command], children, depth + 1)
+            if inner:
+                commands.append(indent + command)
+        else:
+            continue
+        commands += inner
+        if inner and depth:
+            commands.append(f"{indent} exit")
+    return commands
+
+
+def __negate__(command: str) -> str:
+    if command.startswith("interface "):
+        return f"default {command}"
+    if command.startswith("no "):
+        return command[3:]
+    return f"no {command}"
+
+
+def main():
+    with open("output/R2.cfg") as f:
+        config = f.read()
+    previous = config.replace(" neighbor", " neighbor 2001:db8::1 remote-as 1\n neighbor", 1)
+    return config_delta(previous, config)
+
+
+if __name__ == "__main__":
+    pprint(main())
@@ -1,39 +1,254 @@
-from jinja2 import Environment, FileSystemLoader
-import os
-
-
-def ecriture_config(routers_for_template, verbose):
-    # Dossier des templates
-    TEMPLATE_DIR = "templates"
-    # Dossier de sortie
-    OUTPUT_DIR = "output"
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    # Initialisation de Jinja2
-    env = Environment(
-        loader=FileSystemLoader(TEMPLATE_DIR), trim_blocks=True, lstrip_blocks=True
-    )
-
-    if verbose:
-        print("\n#Step 5:")
-        print("Ecriture des configs")
-
-    # Config par routeur
-    template = env.get_template("template_router.j2")
-    for router in routers_for_template:
-        config = template.render(**router)
-
-        emplacement = router["hostname"].split(
-            ":"
-        )  # [0] est l'AS , [1] est le nom du routeur
-
-        filename = f"{emplacement[1]}.cfg"
-        filepath = OUTPUT_DIR
-        os.makedirs(filepath, exist_ok=True)
-        filepath = os.path.join(filepath, filename)
-
-        with open(filepath, "w") as f:
-            f.write(config + "\n")
-
-        if verbose:
-            print(f"Configuration générée: {filepath}")
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+import hashlib
+import json
+import os
+
+try:
+    from src.archive import OUTPUT_DIR, ArchiveWriter, output_path
+    from src.delta import config_delta
+except ImportError:  # Run as a script from src/
+    from archive import OUTPUT_DIR, ArchiveWriter, output_path
+    from delta import config_delta
+
+# Dossier des templates
+TEMPLATE_DIR = "templates"
+TEMPLATE_NAME = "template_router.j2"
+# Empreintes des configs générées (hash du routeur résolu + hash du template)
+MANIFEST_NAME = ".manifest.json"
+# Commandes à appliquer pour passer de l'ancienne config à la nouvelle
+DELTA_EXTENSION = ".delta"
+# Template compilé (bytecode Python), réutilisé entre les exécutions et par
+# les processus de rendu au lieu de recompiler le .j2 à chaque fois
+TEMPLATE_CACHE_DIR = ".template_cache"
+
+# Template et dossier de sortie, chargés une seule fois par processus
+# (voir __load_template__)
+__template__ = None
+__output_dir__ = OUTPUT_DIR
+__delta__ = False
+
+
+# Renvoie la liste des hostnames dont la config a été (ré)écrite
+# output_format : "dir" (un fichier par routeur) ou une archive unique
+# (tar, zip, jsonl, voir archive.py)
+# removed : mise à jour partielle (mode --watch), seuls les routeurs passés
+# sont traités, ceux de `removed` sont supprimés et les autres gardés tels quels
+# delta : écrit aussi, pour chaque config réécrite, les commandes qui mènent
+# de l'ancienne config à la nouvelle (NOM.delta, voir delta.py)
+def ecriture_config(
+    routers_for_template,
+    verbose,
+    jobs=1,
+    force=False,
+    output_dir=OUTPUT_DIR,
+    output_format="dir",
+    removed=None,
+    delta=False,
+) -> list:
+    os.makedirs(output_dir, exist_ok=True)
+    archive_path = output_path(output_dir, output_format)
+    to_archive = output_format != "dir"
+    if to_archive and removed is not None:
+        raise ValueError("Partial updates need the 'dir' output format")
+    if to_archive and delta:
+        raise ValueError("Delta configs need the 'dir' output format")
+
+    # Les deltas décrivent uniquement la dernière exécution
+    if delta:
+        for name in os.listdir(output_dir):
+            if name.endswith(DELTA_EXTENSION):
+                os.remove(os.path.join(output_dir, name))
+
+    if verbose:
+        print("\n#Step 5:")
+        print("Ecriture des configs")
+
+    # Seuls les routeurs dont l'empreinte a changé sont régénérés.
+    # Une archive est réécrite en entier : tous les routeurs sont rendus,
+    # mais seuls ceux qui ont changé sont renvoyés (et exportés)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = __read_manifest__(manifest_path)
+    previous = {} if force else manifest
+    if to_archive and not os.path.isfile(archive_path):
+        previous = {}
+    template_hash = __hash_template__()
+    hashes = {}
+    written = []
+
+    # Les routeurs sont consommés au fur et à mesure : en mode streaming
+    # routers_for_template est un générateur et n'est jamais chargé en entier.
+    # Chaque routeur est converti en contexte du template (dicts imbriqués)
+    def changed_routers():
+        for router in routers_for_template:
+            context = router.template_context()
+            hostname = context["hostname"]
+            hashes[hostname] = __hash_router__(context, template_hash)
+            if previous.get(hostname) != hashes[hostname] or not (
+                to_archive or os.path.isfile(__config_path__(hostname, output_dir))
+            ):
+                written.append(hostname)
+                yield context
+            elif to_archive:
+                yield context
+
+    # Dossier : chaque processus écrit ses fichiers, renvoie leurs chemins
+    # Archive : les configs rendues sont ajoutées à l'archive par ce processus
+    render = __render_routers__ if to_archive else __write_routers__
+
+    def store(results, archive):
+        for result in results:
+            if archive is not None:
+                name, config = result
+                archive.add(name, config)
+                result = f"{archive_path}:{name}.cfg"
+            if verbose:
+                print(f"Configuration générée: {result}")
+
+    # jobs <= 0 : un processus par coeur
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if hasattr(routers_for_template, "__len__") and len(routers_for_template) <= 1:
+        jobs = 1
+
+    with ArchiveWriter(archive_path, output_format) if to_archive else nullcontext() as archive:
+        if jobs > 1:
+            # Répartition du rendu et de l'écriture sur plusieurs processus,
+            # chaque worker charge le template une seule fois
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=__load_template__,
+                initargs=(output_dir, delta),
+            ) as pool:
+                store(__bounded_map__(pool, render, changed_routers(), jobs), archive)
+        else:
+            __load_template__(output_dir, delta)
+            store((r for router in changed_routers() for r in render([router])), archive)
+
+    # Suppression des configs de routeurs qui n'existent plus
+    # (une archive réécrite ne contient déjà plus que les routeurs actuels)
+    stale = previous.keys() - hashes.keys() if removed is None else removed
+    for hostname in stale if not to_archive else []:
+        filepath = __config_path__(hostname, output_dir)
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+            if verbose:
+                print(f"Configuration supprimée: {filepath}")
+
+    if removed is not None:
+        kept = {h: v for h, v in manifest.items() if h not in removed}
+        hashes = {**kept, **hashes}
+
+    with open(manifest_path, "w") as f:
+        json.dump(hashes, f, indent=1, sort_keys=True)
+
+    if verbose:
+        print(
+            f"{len(written)} configuration(s) écrite(s), {len(hashes) - len(written)} inchangée(s)"
+        )
+
+    return written
+
+
+# Envoie les routeurs au pool par paquets, avec un nombre borné de paquets
+# en attente, et renvoie les résultats de `function` dans l'ordre
+def __bounded_map__(pool, function, routers, jobs, chunksize=16):
+    pending = deque()
+    chunk = []
+    for router in routers:
+        chunk.append(router)
+        if len(chunk) < chunksize:
+            continue
+        pending.append(pool.submit(function, chunk))
+        chunk = []
+        if len(pending) >= jobs * 2:
+            yield from pending.popleft().result()
+
+    if chunk:
+        pending.append(pool.submit(function, chunk))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def __config_path__(hostname: str, output_dir: str) -> str:
+    # [0] est l'AS , [1] est le nom du routeur
+    return os.path.join(output_dir, f"{hostname.split(':')[1]}.cfg")
+
+
+def __read_manifest__(manifest_path: str) -> dict:
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def __hash_template__() -> str:
+    with open(os.path.join(TEMPLATE_DIR, TEMPLATE_NAME), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def __hash_router__(router: dict, template_hash: str) -> str:
+    content = json.dumps(router, sort_keys=True, default=str)
+    return hashlib.sha256((template_hash + content).encode()).hexdigest()
+
+
+# Le contexte du template n'est fait que de dicts : `a.b` est cherché comme
+# clé, alors que Jinja essaie d'abord un attribut Python (et lève puis
+# rattrape une exception à chaque accès) avant de se rabattre sur la clé
+class __DictEnvironment__(Environment):
+    def getattr(self, obj, attribute):
+        if type(obj) is dict:
+            if attribute in obj:
+                return obj[attribute]
+            if not hasattr(dict, attribute):  # Clé optionnelle absente
+                return self.undefined(obj=obj, name=attribute)
+        return Environment.getattr(self, obj, attribute)
+
+
+def __load_template__(output_dir=OUTPUT_DIR, delta=False):
+    global __template__, __output_dir__, __delta__
+    __output_dir__ = output_dir
+    __delta__ = delta
+
+    # Initialisation de Jinja2
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    env = __DictEnvironment__(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    __template__ = env.get_template(TEMPLATE_NAME)
+
+
+# Config par routeur, renvoie le chemin du fichier écrit
+def __write_router__(router) -> str:
+    config = __template__.render(**router)
+    filepath = __config_path__(router["hostname"], __output_dir__)
+
+    # Ancienne config, comparée avec la nouvelle (pas de delta pour un nouveau routeur)
+    if __delta__ and os.path.isfile(filepath):
+        with open(filepath) as f:
+            commands = config_delta(f.read(), config)
+        with open(filepath.removesuffix(".cfg") + DELTA_EXTENSION, "w") as f:
+            f.write("".join(command + "\n" for command in commands))
+
+    with open(filepath, "w") as f:
+        f.write(config + "\n")
+
+    return filepath
+
+
+def __write_routers__(routers) -> list:
+    return [__write_router__(router) for router in routers]
+
+
+# Rendu sans écriture (mode archive), renvoie [(nom du routeur, config)]
+def __render_routers__(routers) -> list:
+    return [
+        (router["name"], __template__.render(**router) + "\n") for router in routers
+    ]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import uuid
+from pprint import pprint
+
+try:
+    from src.archive import read_configs
+    from src.links import as_link_graph
+except ImportError:  # Run as a script from src/
+    from archive import read_configs
+    from links import as_link_graph
+
+GNS3_VERSION = "2.2.44"
+PROJECT_REVISION = 9
+# Dynamips c7200 router (the IOS of templates/R1_i1_startup-config.cfg)
+PLATFORM = "c7200"
+IMAGE = "c7200-advipservicesk9-mz.152-4.S5.image"
+RAM = 512
+FIRST_CONSOLE_PORT = 5000
+# Port adapter per interface type, slot 0 is the c7200 I/O controller
+ADAPTERS = {
+    "GigabitEthernet": ("C7200-IO-GE-E", "PA-GE"),
+    "FastEthernet": ("C7200-IO-FE", "PA-FE-TX"),
+}
+INTERFACE_RE = re.compile(r"(GigabitEthernet|FastEthernet)(\d+)/(\d+)$")
+# Slots of the c7200 (slot 0 included), each adapter has a single port
+SLOTS = 7
+# Layout: each AS starts a new row of at most ROW_SIZE routers
+NODE_SPACING = 150
+ROW_SIZE = 20
+
+# node_id / link_id are derived from the project and router names, so
+# regenerating a project keeps the same ids (and diffs only show real changes)
+__namespace__ = uuid.UUID("6ba7b811-9dad-11d1-80b4-00c04fd430c8")  # uuid.NAMESPACE_URL
+
+
+# Offline GNS3 project: `project_dir`/`name`.gns3 with one dynamips node per
+# router and one link per intent link, plus each node's startup config copied
+# from `config_source` (ecriture_config's output directory or archive).
+# Everything is written locally, no GNS3 server is needed: open the .gns3 file
+# in GNS3 to use the lab. Returns the path of the .gns3 file.
+def write_project(
+    data: dict,
+    project_dir: str,
+    config_source: str,
+    verbose: bool = False,
+    links=None,
+) -> str:
+    check_ports(data)
+    links = as_link_graph(data, links)
+    name = os.path.basename(os.path.normpath(project_dir))
+
+    if verbose:
+        print("\n#Projet GNS3:")
+        print(f"Ecriture du projet {name} dans {project_dir}")
+
+    nodes = {
+        hostname: __node__(name, hostname, index, x, y, properties)
+        for index, (hostname, (x, y), properties) in enumerate(node_layout(data))
+    }
+    node_names = {node["name"] for node in nodes.values()}
+
+    topology_links = []
+    for a, b in links.links:
+        ends = [__link_end__(nodes[hostname], ifname) for hostname, ifname, _ in (a, b)]
+        topology_links.append(
+            {
+                "filters": {},
+                "link_id": __uuid__(name, f"{a[0]}:{a[1]}-{b[0]}:{b[1]}"),
+                "nodes": ends,
+                "suspend": False,
+            }
+        )
+
+    # Startup configs, read in one pass when they come from an archive
+    if os.path.isdir(config_source):
+        configs = None
+    else:
+        configs = read_configs(config_source, node_names)
+
+    missing = []
+    for node in nodes.values():
+        config = __read_config__(node["name"], config_source, configs)
+        if config is None:
+            missing.append(node["name"])
+            continue
+        configs_dir = os.path.join(project_dir, __node_dir__(node), "configs")
+        os.makedirs(configs_dir, exist_ok=True)
+        with open(os.path.join(configs_dir, node["properties"]["startup_config"]), "wb") as f:
+            f.write(config)
+        if verbose:
+            print(f"Config de {node['name']}: {configs_dir}")
+
+    if missing:
+        print(f"[-] Aucune config pour {len(missing)} routeur(s): {', '.join(missing[:10])}")
+
+    project = {
+        "auto_close": True,
+        "auto_open": False,
+        "auto_start": False,
+        "drawing_grid_size": 25,
+        "grid_size": 75,
+        "name": name,
+        "project_id": __uuid__(name, ""),
+        "revision": PROJECT_REVISION,
+        "scene_height": 1000,
+        "scene_width": 2000,
+        "show_grid": False,
+        "show_interface_labels": False,
+        "show_layers": False,
+        "snap_to_grid": False,
+        "supplier": None,
+        "topology": {
+            "computes": [],
+            "drawings": [],
+            "links": topology_links,
+            "nodes": list(nodes.values()),
+        },
+        "type": "topology",
+        "variables": None,
+        "version": GNS3_VERSION,
+        "zoom": 100,
+    }
+
+    # Written next to the final file then moved, GNS3 never reads a partial project
+    path = os.path.join(project_dir, f"{name}.gns3")
+    os.makedirs(project_dir, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(project, f, indent=4, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+    print(
+        f"[+] Projet GNS3 écrit: {path} ({len(nodes)} routeurs, {len(topology_links)} liens)"
+    )
+    return path
+
+
+def __uuid__(project_name: str, key: str) -> str:
+    return str(uuid.uuid5(__namespace__, f"gns3:{project_name}:{key}"))
+
+
+# [(hostname, (x, y), node properties)] for every router of the intent, the
+# properties hold the port adapters needed by the router's interfaces
+def node_layout(data: dict) -> list:
+    layout = []
+    node_names = set()
+    row = 0
+    for as_number, as_data in data.items():
+        for index, (router_id, router) in enumerate(as_data["routers"].items()):
+            hostname = f"{as_number}:{router_id}"
+            if router_id in node_names:
+                raise ValueError(
+                    f"Router {hostname}: GNS3 node names must be unique, {router_id} is used twice"
+                )
+            node_names.add(router_id)
+
+            properties = {"image": IMAGE, "platform": PLATFORM, "ram": RAM}
+            for ifname in router["interfaces"]:
+                kind, slot, _ = interface_port(hostname, ifname)
+                properties[f"slot{slot}"] = ADAPTERS[kind][0 if slot == 0 else 1]
+
+            position = (
+                NODE_SPACING * (index % ROW_SIZE),
+                NODE_SPACING * (row + index // ROW_SIZE),
+            )
+            layout.append((hostname, position, properties))
+        row += (len(as_data["routers"]) - 1) // ROW_SIZE + 1
+    return layout
+
+
+# (interface type, adapter number, port number) of an interface,
+# e.g. GigabitEthernet1/0 -> ("GigabitEthernet", 1, 0)
+def interface_port(hostname: str, ifname: str) -> tuple:
+    match = INTERFACE_RE.match(ifname)
+    if match is None:
+        raise ValueError(
+            f"Router {hostname}: interface {ifname} has no GNS3 port (expected one of {list(ADAPTERS)} N/M)"
+        )
+    kind, slot, port = match.group(1), int(match.group(2)), int(match.group(3))
+    if slot >= SLOTS or port != 0:
+        raise ValueError(
+            f"Router {hostname}: interface {ifname} has no GNS3 port (a {PLATFORM} has {kind}0/0 to {kind}{SLOTS - 1}/0)"
+        )
+    return kind, slot, port
+
+
+# Raise a single ValueError listing every interface without a GNS3 port,
+# before anything is written to a project or created on a server
+def check_ports(data: dict):
+    errors = []
+    for as_number, as_data in data.items():
+        for router_id, router in as_data["routers"].items():
+            for ifname in router["interfaces"]:
+                try:
+                    interface_port(f"{as_number}:{router_id}", ifname)
+                except ValueError as e:
+                    errors.append(str(e))
+    if errors:
+        raise ValueError(
+            f"{len(errors)} interface(s) without a GNS3 port:\n  " + "\n  ".join(errors)
+        )
+
+
+def __node__(
+    project_name: str, hostname: str, index: int, x: int, y: int, properties: dict
+) -> dict:
+    router_id = hostname.split(":")[1]
+    dynamips_id = index + 1
+    return {
+        "compute_id": "local",
+        "console": FIRST_CONSOLE_PORT + index,
+        "console_auto_start": False,
+        "console_type": "telnet",
+        "custom_adapters": [],
+        "first_port_name": None,
+        "height": 45,
+        "label": {
+            "rotation": 0,
+            "style": "font-family: TypeWriter;font-size: 10.0;font-weight: bold;fill: #000000;fill-opacity: 1.0;",
+            "text": router_id,
+            "x": 5,
+            "y": -25,
+        },
+        "locked": False,
+        "name": router_id,
+        "node_id": __uuid__(project_name, hostname),
+        "node_type": "dynamips",
+        "port_name_format": "Ethernet{0}",
+        "port_segment_size": 0,
+        "properties": {
+            **properties,
+            "dynamips_id": dynamips_id,
+            "startup_config": f"i{dynamips_id}_startup-config.cfg",
+        },
+        "symbol": ":/symbols/router.svg",
+        "width": 66,
+        "x": x,
+        "y": y,
+        "z": 1,
+    }
+
+
+def __link_end__(node: dict, ifname: str) -> dict:
+    _, slot, port = interface_port(node["name"], ifname)
+    return {
+        "adapter_number": slot,
+        "label": {"rotation": 0, "style": "", "text": ifname, "x": 0, "y": 0},
+        "node_id": node["node_id"],
+        "port_number": port,
+    }
+
+
+# Relative to the project directory
+def __node_dir__(node: dict) -> str:
+    return os.path.join("project-files", "dynamips", node["node_id"])
+
+
+def __read_config__(name: str, config_source: str, configs) -> bytes:
+    if configs is not None:
+        return configs.get(name)
+    path = os.path.join(config_source, f"{name}.cfg")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    from intent import load_intent
+
+    return write_project(load_intent("templates/example.yaml"), "projects/example", "output")
+
+
+if __name__ == "__main__":
+    pprint(main())
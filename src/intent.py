@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import pickle
+from pprint import pprint
+
+# Parsed intents are cached here, one pickle file per intent file
+CACHE_DIR = ".intent_cache"
+CACHE_VERSION = 1
+
+
+# Load an intent file, skipping YAML parsing when a cached copy is up to date
+def load_intent(file_path: str, use_cache: bool = True) -> dict:
+    if not use_cache:
+        with open(file_path, "rb") as f:
+            return __parse__(f.read())
+
+    cache_path = __cache_path__(file_path)
+    stat = os.stat(file_path)
+    cached = __read_cache__(cache_path)
+
+    # Same mtime and size: trust the cache without reading the intent
+    if cached is not None and (cached["mtime_ns"], cached["size"]) == (
+        stat.st_mtime_ns,
+        stat.st_size,
+    ):
+        return cached["data"]
+
+    with open(file_path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    # File touched but content unchanged
+    if cached is not None and cached["sha256"] == digest:
+        data = cached["data"]
+    else:
+        data = __parse__(content)
+
+    __write_cache__(
+        cache_path,
+        {
+            "version": CACHE_VERSION,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "data": data,
+        },
+    )
+    return data
+
+
+def __parse__(content: bytes) -> dict:
+    import yaml  # Not imported at all when the cached intent is used
+
+    # libyaml's C loader is much faster, fall back to the pure Python one
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    data = yaml.load(content, Loader=loader)
+
+    # The "ASs" header is optional
+    first_key = list(data.keys())[0]
+    if (type(first_key) == str) and (first_key.lower() == "ass"):
+        data = data[first_key]
+
+    return data
+
+
+def __cache_path__(file_path: str) -> str:
+    key = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{key}.pickle")
+
+
+def __read_cache__(cache_path: str):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+    return cached
+
+
+def __write_cache__(cache_path: str, cached: dict):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write then rename so that a concurrent run never reads half a file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # The cache is only an optimisation
+
+
+def main():
+    return load_intent("templates/example.yaml")
+
+
+if __name__ == "__main__":
+    pprint(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+from collections import deque
+from pprint import pprint
+
+try:
+    from src.registry import normalize_hostname
+except ImportError:  # Run as a script from src/
+    from registry import normalize_hostname
+
+
+# Normalized link graph of the intent, built once and shared by the steps.
+# An endpoint is a (hostname, interface name, interface data) tuple, where the
+# interface data is the intent's own dict (so addresses assigned by step1 are
+# visible). The k-th interface of A towards B is linked to the k-th interface
+# of B towards A. Interfaces that can't be linked are reported in `errors`.
+class LinkGraph:
+    def __init__(self, data: dict):
+        self.links = []  # [(endpoint, endpoint)], first seen endpoint first
+        self.peers = {}  # (hostname, interface name) -> remote endpoint
+        self.towards = {}  # (hostname, neighbour hostname) -> [endpoints]
+        self.errors = []
+
+        pending = {}  # (hostname, neighbour) -> endpoints waiting for their peer
+        for as_number, as_data in data.items():
+            for router_id, router in as_data["routers"].items():
+                hostname = f"{as_number}:{router_id}"
+                for name, interface in router["interfaces"].items():
+                    if "neighbour" not in interface:
+                        self.errors.append(f"{hostname}:{name} has no neighbour")
+                        continue
+
+                    neighbour = normalize_hostname(as_number, interface["neighbour"])
+                    endpoint = (hostname, name, interface)
+                    self.towards.setdefault((hostname, neighbour), []).append(endpoint)
+
+                    waiting = pending.get((neighbour, hostname))
+                    if waiting:
+                        other = waiting.popleft()
+                        if not waiting:
+                            del pending[(neighbour, hostname)]
+                        self.links.append((other, endpoint))
+                        self.peers[other[:2]] = endpoint
+                        self.peers[endpoint[:2]] = other
+                    else:
+                        pending.setdefault((hostname, neighbour), deque()).append(endpoint)
+
+        # Whatever is left has no interface on the other side
+        for (hostname, neighbour), endpoints in pending.items():
+            for _, name, _ in endpoints:
+                if not __router_exists__(data, neighbour):
+                    self.errors.append(
+                        f"{hostname}:{name} references unknown router {neighbour}"
+                    )
+                else:
+                    self.errors.append(
+                        f"{hostname}:{name} has neighbour {neighbour}, but {neighbour} has no matching interface towards {hostname}"
+                    )
+
+    def validate(self):
+        if self.errors:
+            raise ValueError(
+                f"{len(self.errors)} invalid link(s):\n  " + "\n  ".join(self.errors)
+            )
+        return self
+
+    # Remote endpoint of an interface, or None
+    def peer(self, hostname: str, interface_name: str):
+        return self.peers.get((hostname, interface_name))
+
+    # First interface of `hostname` towards `neighbour`, or None
+    def interface_towards(self, hostname: str, neighbour: str):
+        endpoints = self.towards.get((hostname, neighbour))
+        return endpoints[0] if endpoints else None
+
+
+def __router_exists__(data: dict, hostname: str) -> bool:
+    as_number, _, router_id = hostname.partition(":")
+    try:
+        as_data = data.get(int(as_number))
+    except ValueError:
+        return False
+    return as_data is not None and router_id in as_data["routers"]
+
+
+# Build and validate the graph unless the caller already did it
+def as_link_graph(data: dict, links: LinkGraph = None) -> LinkGraph:
+    if links is not None:
+        return links
+    return LinkGraph(data).validate()
+
+
+def main():
+    from intent import load_intent
+
+    graph = as_link_graph(load_intent("templates/example.yaml"))
+    return [(a[:2], b[:2]) for a, b in graph.links]
+
+
+if __name__ == "__main__":
+    pprint(main())
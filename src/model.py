@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import sys
+from dataclasses import dataclass, field
+
+
+# Typed model of the routers built by steps 2 to 4.
+# The classes use __slots__ (no per-instance __dict__) and the AS / router ids
+# are interned and split once, so the steps never re-parse "as:router" strings.
+# template_context() converts a router to the nested dicts expected by
+# template_router.j2 (and hashed in the manifest): optional values left to
+# None are omitted, exactly like the keys that used to be missing. Values the
+# template would otherwise recompute (short hostname, neighbour address
+# without prefix length, ...) are computed once here.
+
+
+@dataclass(slots=True)
+class Interface:
+    name: str
+    ipv6_addresses: list
+    neighbour: str
+    rip_enable: bool = False
+    ipv6_enable: bool = True
+    ospf_area: int = None
+    ospf_metric: int = None
+
+    def template_context(self) -> dict:
+        context = {
+            "name": self.name,
+            "ipv6_enable": self.ipv6_enable,
+            "rip_enable": self.rip_enable,
+            "ipv6_addresses": self.ipv6_addresses,
+            "neighbour": self.neighbour,
+        }
+        if self.ospf_area is not None:
+            context["ospf_area"] = self.ospf_area
+        if self.ospf_metric is not None:
+            context["ospf_metric"] = self.ospf_metric
+        return context
+
+
+@dataclass(slots=True)
+class BgpNeighbour:
+    address: str  # IPv6 address, with or without prefix length
+    remote_as: str
+    route_reflector_client: bool = False
+    confederation_peer: bool = False
+
+    def template_context(self) -> dict:
+        context = {
+            "address": {"ipv6": self.address},
+            "ip": self.address.partition("/")[0],
+            "remote_as": self.remote_as,
+        }
+        if self.route_reflector_client:
+            context["route_reflector_client"] = True
+        if self.confederation_peer:
+            context["confederation_peer"] = True
+        return context
+
+
+@dataclass(slots=True)
+class Bgp:
+    as_number: str  # "as" in the template (sub-AS for confederation members)
+    router_id: str
+    neighbours: list = field(default_factory=list)
+    next_hop_self: bool = False
+    cluster_id: str = None
+    confederation: dict = None  # {"identifier": as, "peers": [sub-ASes]}
+
+    def template_context(self) -> dict:
+        context = {
+            "as": self.as_number,
+            "router_id": self.router_id,
+            "neighbours": [n.template_context() for n in self.neighbours],
+        }
+        # Sessions sourced from the loopback (iBGP and confederation peers)
+        for neighbour in context["neighbours"]:
+            neighbour["loopback_session"] = (
+                neighbour["remote_as"] == self.as_number
+                or "confederation_peer" in neighbour
+            )
+        if self.next_hop_self:
+            context["next_hop_self"] = True
+        if self.cluster_id is not None:
+            context["cluster_id"] = self.cluster_id
+        if self.confederation is not None:
+            context["confederation"] = self.confederation
+        return context
+
+
+@dataclass(slots=True)
+class Router:
+    as_number: str
+    router_id: str
+    loopback: str = None
+    interfaces: list = field(default_factory=list)
+    ospf: bool = False
+    bgp: Bgp = None
+    hostname: str = field(init=False)
+
+    def __post_init__(self):
+        self.as_number = sys.intern(str(self.as_number))
+        self.router_id = sys.intern(self.router_id)
+        self.hostname = sys.intern(f"{self.as_number}:{self.router_id}")
+
+    # 32-bit router-id of OSPFv3 and BGP, from the number in the router name:
+    # 1.1.1.N up to R255, then the number carries into the third octet (R256
+    # is 1.1.2.0) so that up to 65279 routers get distinct valid ids
+    @property
+    def ipv4_router_id(self) -> str:
+        number = self.router_id[1:]
+        if not number.isdigit():
+            return f"1.1.1.{number}"  # Invalid, reported by --verify
+        number = int(number)
+        return f"1.1.{1 + number // 256}.{number % 256}"
+
+    def template_context(self) -> dict:
+        context = {
+            "hostname": self.hostname,
+            "name": self.router_id,
+            "ipv4_router_id": self.ipv4_router_id,
+            "loopback": {"ipv6": self.loopback},
+            "interfaces": [i.template_context() for i in self.interfaces],
+        }
+        # The loopback joins the OSPF area of the first OSPF interface
+        for interface in self.interfaces:
+            if interface.ospf_area is not None:
+                context["loopback"]["ospf_area"] = interface.ospf_area
+                break
+        if self.ospf:
+            context["ospf"] = {"router_id": self.router_id}
+        if self.bgp is not None:
+            context["bgp"] = self.bgp.template_context()
+        return context
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pprint import pprint
+
+try:
+    from src.links import as_link_graph
+    from src.registry import RouterRegistry
+    from src.step1 import step1
+    from src.stream import resolve_as
+except ImportError:  # Run as a script from src/
+    from links import as_link_graph
+    from registry import RouterRegistry
+    from step1 import step1
+    from stream import resolve_as
+
+# Intent and link graph of the worker processes (see __init_worker__)
+__data__ = None
+__links__ = None
+
+
+# Steps 2 to 4 with one task per AS spread over a process pool.
+# Each AS only reads the other ASes from the intent (like the streaming
+# mode), so ASes are independent. step1 must already have been run: the
+# workers receive the intent with every link address assigned. Routers are
+# merged in the intent's AS order, so the result doesn't depend on scheduling.
+def resolve_parallel(
+    data: dict, processes: int = 0, verbose: bool = False, links=None
+) -> RouterRegistry:
+    links = as_link_graph(data, links)
+    as_numbers = list(data.keys())
+
+    # processes <= 0: one process per CPU
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(as_numbers))
+
+    if verbose:
+        print("\n#STEP 2-4 (parallel):")
+        print(f"Resolving {len(as_numbers)} AS with {processes} processes")
+
+    routers = RouterRegistry(intent=data)
+    if processes <= 1:
+        for as_number in as_numbers:
+            routers.extend(resolve_as(data, as_number, links))
+        return routers
+
+    chunksize = max(1, len(as_numbers) // (processes * 4))
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=__init_worker__, initargs=(data, links)
+    ) as pool:
+        for as_routers in pool.map(__resolve_as__, as_numbers, chunksize=chunksize):
+            routers.extend(as_routers)
+
+    if verbose:
+        print(f"{len(routers)} routers resolved")
+
+    return routers
+
+
+def __init_worker__(data: dict, links):
+    global __data__, __links__
+    __data__ = data
+    __links__ = links
+
+
+# Plain list: the registry would also send the whole intent back
+def __resolve_as__(as_number) -> list:
+    return list(resolve_as(__data__, as_number, __links__))
+
+
+def main():
+    from intent import load_intent
+
+    data = load_intent("templates/example.yaml")
+    links = as_link_graph(data)
+    step1(data, links=links)
+    return resolve_parallel(data, 2, True, links)
+
+
+if __name__ == "__main__":
+    pprint(main())
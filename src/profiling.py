@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import cProfile
+import gc
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+# Per-stage measurements for pipeline.py (--timings / --profile):
+# wall time, CPU time, peak RSS and live object count after each stage,
+# with an optional cProfile dump per stage
+class StageProfiler:
+    def __init__(self, enabled: bool = False, profile_dir: str = None):
+        self.enabled = enabled or profile_dir is not None
+        self.profile_dir = profile_dir
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        profiler = None
+        if self.profile_dir is not None:
+            profiler = cProfile.Profile()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+
+            stage = {
+                "stage": name,
+                "wall_time": wall,
+                "cpu_time": cpu,
+                "peak_rss": peak_rss(),
+                "objects": len(gc.get_objects()),
+            }
+            if profiler is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                stage["profile"] = os.path.join(self.profile_dir, f"{name}.prof")
+                profiler.dump_stats(stage["profile"])
+            self.stages.append(stage)
+
+    def report(self):
+        print("\n#Timings:")
+        print(f"  {'stage':<16} {'wall (ms)':>10} {'cpu (ms)':>10} {'peak RSS (MiB)':>15} {'objects':>10}")
+        for stage in self.stages:
+            print(
+                f"  {stage['stage']:<16} {stage['wall_time'] * 1000:10.1f} {stage['cpu_time'] * 1000:10.1f}"
+                f" {stage['peak_rss'] / 2**20:15.1f} {stage['objects']:10d}"
+            )
+        total = sum(stage["wall_time"] for stage in self.stages)
+        print(f"  {'total':<16} {total * 1000:10.1f}")
+        if self.profile_dir is not None:
+            print(f"cProfile dumps written in {self.profile_dir}/")
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+
+
+# Peak resident memory of the process in bytes (ru_maxrss is in kilobytes on
+# Linux, bytes on macOS)
+def peak_rss() -> int:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+try:
+    from src.model import Interface, Router
+except ImportError:  # Run as a script from src/
+    from model import Interface, Router
+
+
+# Normalize a neighbour reference to the full "as_number:router_id" format
+def normalize_hostname(as_number, neighbour: str) -> str:
+    return neighbour if ":" in neighbour else f"{as_number}:{neighbour}"
+
+
+# ASes of the intent to process, all of them by default
+def iter_ases(data: dict, as_numbers=None):
+    if as_numbers is None:
+        return data.items()
+    return ((as_number, data[as_number]) for as_number in as_numbers)
+
+
+# List of routers (as produced by step2) indexed by hostname and interface.
+# It is still a plain list for ecriture_config, but lookups that used to
+# be `next(r for r in routers if ...)` scans are O(1) dict accesses.
+# When only part of the routers is loaded (streaming mode), lookups of other
+# routers are answered from the intent, without keeping them in memory.
+class RouterRegistry(list):
+    def __init__(self, routers=(), intent: dict = None):
+        super().__init__()
+        self.intent = intent
+        self.by_hostname = {}  # "as:router" -> Router
+        self.by_interface = {}  # ("as:router", interface name) -> Interface
+        for router in routers:
+            self.append(router)
+
+    def append(self, router):
+        super().append(router)
+        self.__index_router__(router)
+
+    def extend(self, routers):
+        for router in routers:
+            self.append(router)
+
+    def get(self, hostname: str):
+        if hostname not in self.by_hostname and self.intent is not None:
+            return self.__from_intent__(hostname)
+        return self.by_hostname[hostname]
+
+    def interface(self, hostname: str, interface_name: str):
+        if hostname not in self.by_hostname and self.intent is not None:
+            for interface in self.__from_intent__(hostname).interfaces:
+                if interface.name == interface_name:
+                    return interface
+        return self.by_interface[(hostname, interface_name)]
+
+    # Minimal router (hostname and interfaces) read from the intent
+    def __from_intent__(self, hostname: str):
+        as_number, router_id = hostname.split(":")
+        as_data = self.intent.get(int(as_number))
+        if as_data is None or router_id not in as_data["routers"]:
+            raise KeyError(hostname)
+
+        interfaces = [
+            Interface(
+                name=int_name,
+                ipv6_addresses=int_data.get("addresses"),
+                neighbour=int_data["neighbour"],
+            )
+            for int_name, int_data in as_data["routers"][router_id]["interfaces"].items()
+        ]
+        return Router(as_number, router_id, interfaces=interfaces)
+
+    def __index_router__(self, router):
+        self.by_hostname[router.hostname] = router
+        for interface in router.interfaces:
+            self.by_interface[(router.hostname, interface.name)] = interface
+
+
+# Steps may be called with a plain list (e.g. from their main()), wrap it if needed
+def as_registry(routers) -> RouterRegistry:
+    if isinstance(routers, RouterRegistry):
+        return routers
+    return RouterRegistry(routers)
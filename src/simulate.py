@@ -0,0 +1,704 @@
+#!/usr/bin/env python3
+import heapq
+import ipaddress
+from collections import deque
+from dataclasses import dataclass
+from pprint import pprint
+
+# Cost of an interface without ipv6 ospf cost (GigabitEthernet, default
+# reference bandwidth)
+DEFAULT_OSPF_COST = 1
+BACKBONE = 0
+# Messages allowed per BGP session and prefix before giving up on convergence
+MAX_UPDATES_PER_SESSION = 20
+# Problems and unreachable pairs printed without verbose
+REPORT_LIMIT = 10
+# Largest number of ASes printed as a matrix
+MATRIX_MAX_AS = 12
+
+# Forwarding decisions of a router for a destination
+DELIVERED = -1
+DROPPED = -2
+# Walk states, a column holds the final ones
+UNKNOWN, REACHABLE, DROPPED_ON_PATH, LOOPING, ON_PATH = 0, 1, 2, 3, 4
+REASONS = {DROPPED_ON_PATH: "no route", LOOPING: "forwarding loop"}
+
+
+@dataclass(slots=True, frozen=True)
+class BgpRoute:
+    as_path: tuple  # Outside the confederation (its identifier counts once)
+    confed_path: tuple  # Member sub-ASes crossed, not counted in the length
+    next_hop: int
+    learned: str  # "local", "ebgp", "confed" or "ibgp"
+    peer: int  # Router the route was received from (-1 when local)
+    originator: int = -1  # Route reflection loop prevention
+    cluster_list: tuple = ()
+
+
+@dataclass(slots=True)
+class BgpSession:
+    peer: int
+    kind: str  # "ebgp", "confed" or "ibgp"
+    source: int  # Our address on the session (next hop we advertise)
+    rr_client: bool = False
+    next_hop_self: bool = False
+
+
+# Offline control plane of the resolved routers, as template_router.j2
+# configures them, and the loopback to loopback reachability it gives:
+# - OSPFv3: enabled on the interfaces with an area towards a router of the
+#   same AS (neighbour written without AS), cost from ospf_metric. Dijkstra
+#   per area from every router, inter-area routes through the ABRs of the
+#   backbone. The loopback joins the area of the first interface.
+# - BGP: sessions are up when both ends configure each other (addresses,
+#   remote-as) and loopback sessions have an OSPF route. Every router
+#   redistributes its connected networks; routes are propagated per prefix
+#   with the eBGP / iBGP / route reflection / confederation rules, next-hop-self
+#   on iBGP sessions, and the usual best path selection (AS path length,
+#   eBGP over iBGP, IGP cost to the next hop, lowest peer).
+# - RIPng isn't simulated: Loopback0 is never RIP-enabled, so it carries no
+#   loopback.
+# - The router-id written by the template (Router.ipv4_router_id) must be a
+#   valid IPv4 address, otherwise neither OSPFv3 nor BGP can start on the router.
+# Each destination gets one forwarding decision per router (OSPF, then BGP
+# with its resolved next hop), and every packet is then walked hop by hop
+# (a router without a route drops, a loop is detected), with the results of
+# a walk shared by all the routers on its path.
+class RoutingSimulation:
+    def __init__(self, routers):
+        # Routers grouped by AS (in order), so that an AS is a slice of a column
+        routers = [r for r in routers if r.loopback]
+        order = {}
+        for router in routers:
+            order.setdefault(router.as_number, len(order))
+        self.routers = sorted(routers, key=lambda r: order[r.as_number])
+        self.names = [r.hostname for r in self.routers]
+        count = len(self.routers)
+
+        self.problems = []
+        self.sessions_down = []
+        self.as_slices = {}  # as_number -> (start, end) in self.routers
+        # Addresses are integers and networks (address >> host bits, prefix
+        # length): no ipaddress object is built once the intent is indexed
+        self.owner = {}  # address -> router index
+        self.subnets = {}  # network -> [(router index, interface, address)]
+        self.connected = [set() for _ in range(count)]  # networks of each router
+        self.loopbacks = []
+        self.up = []  # Routing processes able to start (valid router-id)
+
+        for i, router in enumerate(self.routers):
+            start, _ = self.as_slices.get(router.as_number, (i, i))
+            self.as_slices[router.as_number] = (start, i + 1)
+
+            loopback = __address__(router.loopback)
+            self.loopbacks.append(loopback)
+            self.owner[loopback] = i
+            for interface in router.interfaces:
+                for address in interface.ipv6_addresses or []:
+                    parsed = __address__(address)
+                    network = __network__(parsed, int(address.partition("/")[2] or 128))
+                    self.owner[parsed] = i
+                    self.subnets.setdefault(network, []).append((i, interface, parsed))
+                    self.connected[i].add(network)
+
+            router_id = router.ipv4_router_id
+            try:
+                ipaddress.IPv4Address(router_id)
+                self.up.append(True)
+            except ValueError:
+                self.up.append(False)
+                self.problems.append(
+                    f"{router.hostname}: router-id {router_id} is not an IPv4 address, OSPFv3 and BGP can't start"
+                )
+
+        self.igp = [{} for _ in range(count)]  # i -> {j: (cost, first hop)} to j's loopback
+        self.sessions = [[] for _ in range(count)]
+        self.external_sessions = [[] for _ in range(count)]  # eBGP and confederation
+        self.clients = [set() for _ in range(count)]  # Route reflector clients
+        self.link_routes = {}  # network -> {i: (cost, first hop)} from BGP
+        self.columns = []  # Per destination: bytes, 1 when the source reaches it
+
+    def run(self):
+        self.__ospf__()
+        self.__bgp_sessions__()
+        self.session_count = sum(map(len, self.sessions))
+
+        # Next hops on eBGP links are resolved through the BGP routes of the
+        # link networks (redistributed by both ends)
+        for network in {
+            self.__connected_network__(i, s.source)
+            for i, sessions in enumerate(self.sessions)
+            for s in sessions
+            if s.kind == "ebgp"
+        }:
+            origins = [i for i, _, _ in self.subnets[network] if self.routers[i].bgp]
+            best = self.__bgp_best__(origins, __format_network__(network), resolve_links=False)
+            self.link_routes[network] = {
+                i: candidate[1] for i, candidate in best.items() if candidate[1]
+            }
+        # ASes whose BGP sessions all stay inside the AS: the routes of their
+        # loopbacks never leave them
+        self.closed_ases = {
+            as_number
+            for as_number, (start, end) in self.as_slices.items()
+            if all(start <= s.peer < end for i in range(start, end) for s in self.sessions[i])
+        }
+
+        for d in range(len(self.routers)):
+            self.columns.append(self.__reachability__(d))
+        return self
+
+    # ==============================
+    # OSPFv3
+    # ==============================
+    def __ospf__(self):
+        count = len(self.routers)
+        areas = [set() for _ in range(count)]
+        self.loopback_area = [None] * count
+        graphs = {}  # (as_number, area) -> {i: [(j, cost)]}
+
+        for i, router in enumerate(self.routers):
+            if not self.up[i]:
+                continue
+            for interface in router.interfaces:
+                if interface.ospf_area is not None:
+                    self.loopback_area[i] = interface.ospf_area
+                    areas[i].add(interface.ospf_area)
+                    break
+
+        for members in self.subnets.values():
+            enabled = [
+                (i, interface)
+                for i, interface, _ in members
+                if self.up[i] and __ospf_enabled__(interface)
+            ]
+            for i, interface in enabled:
+                areas[i].add(interface.ospf_area)
+                graph = graphs.setdefault(
+                    (self.routers[i].as_number, interface.ospf_area), {}
+                )
+                for j, other in enabled:
+                    if j != i and other.ospf_area == interface.ospf_area and (
+                        self.routers[j].as_number == self.routers[i].as_number
+                    ):
+                        cost = interface.ospf_metric or DEFAULT_OSPF_COST
+                        graph.setdefault(i, []).append((j, cost))
+
+        for as_number, (start, end) in self.as_slices.items():
+            members = [i for i in range(start, end) if areas[i]]
+            if not members:
+                continue
+            area_ids = {area for i in members for area in areas[i]}
+            # dist[area][i] = {j: (cost, first hop)} inside the area
+            dist = {
+                area: {
+                    i: __dijkstra__(graphs.get((as_number, area), {}), i)
+                    for i in members
+                    if area in areas[i]
+                }
+                for area in area_ids
+            }
+            abrs = [i for i in members if BACKBONE in areas[i] and len(areas[i]) > 1]
+
+            # Backbone routers: intra-area routes first, then the summaries of
+            # the ABRs (cost to the ABR + intra-area cost of the ABR)
+            backbone = {}
+            for i in members:
+                routes = {}
+                for j in members:
+                    area = self.loopback_area[j]
+                    if area is not None and area in areas[i]:
+                        route = dist[area][i].get(j)
+                        if route is not None:
+                            routes[j] = route
+                if BACKBONE in areas[i]:
+                    for j in members:
+                        area = self.loopback_area[j]
+                        if j in routes or area is None or area == BACKBONE:
+                            continue
+                        for b in abrs:
+                            to_abr = dist[BACKBONE][i].get(b) if b != i else None
+                            inside = dist.get(area, {}).get(b, {}).get(j)
+                            if to_abr is None or inside is None:
+                                continue
+                            cost = to_abr[0] + inside[0]
+                            if j not in routes or cost < routes[j][0]:
+                                routes[j] = (cost, to_abr[1])
+                    backbone[i] = routes
+                self.igp[i] = routes
+
+            # Other routers: summaries sent into their area by its ABRs
+            for i in members:
+                if BACKBONE in areas[i]:
+                    continue
+                routes = self.igp[i]
+                for j in members:
+                    if j in routes or self.loopback_area[j] is None:
+                        continue
+                    for area in areas[i]:
+                        for b in abrs:
+                            if area not in areas[b]:
+                                continue
+                            to_abr = dist[area][i].get(b)
+                            beyond = (0, None) if b == j else backbone[b].get(j)
+                            if to_abr is None or beyond is None:
+                                continue
+                            cost = to_abr[0] + beyond[0]
+                            if j not in routes or cost < routes[j][0]:
+                                routes[j] = (cost, to_abr[1])
+
+    # ==============================
+    # BGP
+    # ==============================
+    def __bgp_sessions__(self):
+        # Neighbour addresses of each router, a full mesh repeats every loopback
+        parsed = {}
+        neighbours = [
+            [
+                (n, parsed.get(n.address) or parsed.setdefault(n.address, __address__(n.address)))
+                for n in router.bgp.neighbours
+            ]
+            if router.bgp is not None
+            else []
+            for router in self.routers
+        ]
+        configured = [{address for _, address in n} for n in neighbours]
+
+        reported = set()
+        for i, router in enumerate(self.routers):
+            bgp = router.bgp
+            if bgp is None or not self.up[i]:
+                continue
+            for neighbour, address in neighbours[i]:
+                loopback_session = (
+                    neighbour.remote_as == bgp.as_number or neighbour.confederation_peer
+                )
+                problem, source = self.__check_session__(
+                    i, address, neighbour.remote_as, loopback_session, configured
+                )
+                if problem is not None:
+                    key = frozenset((i, self.owner.get(address, address)))
+                    if key not in reported:
+                        reported.add(key)
+                        self.sessions_down.append(
+                            f"{router.hostname} -> {__format_address__(address)} (AS {neighbour.remote_as}): {problem}"
+                        )
+                    continue
+
+                if neighbour.remote_as == bgp.as_number:
+                    kind = "ibgp"
+                elif neighbour.confederation_peer:
+                    kind = "confed"
+                else:
+                    kind = "ebgp"
+                session = BgpSession(
+                    self.owner[address],
+                    kind,
+                    source,
+                    neighbour.route_reflector_client,
+                    bgp.next_hop_self and kind == "ibgp",
+                )
+                self.sessions[i].append(session)
+                if kind != "ibgp":
+                    self.external_sessions[i].append(session)
+                elif session.rr_client:
+                    self.clients[i].add(session.peer)
+
+    # Returns (problem or None, our source address)
+    def __check_session__(self, i, address, remote_as, loopback_session, configured) -> tuple:
+        j = self.owner.get(address)
+        if j is None:
+            return "no router has this address", None
+        peer = self.routers[j].bgp
+        if peer is None or not self.up[j]:
+            return f"no BGP on {self.names[j]}", None
+        expected = __as_seen_by__(self.routers[i].bgp, peer)
+        if expected != remote_as:
+            return f"remote-as {remote_as}, but {self.names[j]} is AS {expected}", None
+
+        if loopback_session:
+            source = self.loopbacks[i]
+            if j not in self.igp[i] or i not in self.igp[j]:
+                return "loopbacks not reachable through OSPF", source
+        else:
+            network = self.__connected_network__(i, address)
+            if network is None:
+                return "not on a connected network", None
+            source = next(a for k, _, a in self.subnets[network] if k == i)
+
+        if source not in configured[j]:
+            return f"{self.names[j]} has no neighbor {__format_address__(source)}", source
+        return None, source
+
+    # Best route of every router for a prefix redistributed by `origins`,
+    # {router: (selection key, (IGP cost, first hop), route)}
+    def __bgp_best__(self, origins, prefix, resolve_links=True) -> dict:
+        best = {}
+        adj_in = {}
+        local = BgpRoute((), (), None, "local", -1)
+        for o in origins:
+            if self.up[o]:
+                best[o] = ((-1,), None, local)
+        queue = deque(best)
+        budget = MAX_UPDATES_PER_SESSION * max(1, self.session_count)
+        sent_ibgp = set()  # Routers having advertised the prefix over iBGP
+
+        while queue:
+            r = queue.popleft()
+            current = best.get(r)
+            # A route learned over iBGP only goes back to iBGP peers through a
+            # route reflector: the other routers of a full mesh skip the loop
+            if current is not None and (current[2].learned != "ibgp" or self.clients[r]):
+                sessions = self.sessions[r]
+                sent_ibgp.add(r)
+            elif r in sent_ibgp:
+                sessions = self.sessions[r]  # Withdraw the previous advertisements
+                sent_ibgp.discard(r)
+            else:
+                sessions = self.external_sessions[r]
+            for session in sessions:
+                p = session.peer
+                route = self.__advertise__(r, current, session) if current else None
+                candidate = None
+                if route is not None:
+                    candidate = self.__receive__(p, route, resolve_links)
+                inbox = adj_in.setdefault(p, {})
+                if candidate is None:
+                    if inbox.pop(r, None) is None:
+                        continue
+                elif inbox.get(r) == candidate:
+                    continue
+                else:
+                    inbox[r] = candidate
+
+                if p in origins:
+                    continue
+                new = min(inbox.values(), key=lambda c: c[0], default=None)
+                if new != best.get(p):
+                    if new is None:
+                        del best[p]
+                    else:
+                        best[p] = new
+                    queue.append(p)
+
+                budget -= 1
+                if budget < 0:
+                    self.problems.append(f"BGP doesn't converge for {prefix}")
+                    return best
+        return best
+
+    # Route sent by r to a session, None when it isn't advertised
+    def __advertise__(self, r, current, session):
+        route = current[2]
+        bgp = self.routers[r].bgp
+        p = session.peer
+        local_or_nhs = route.learned == "local" or session.next_hop_self
+
+        if session.kind == "ebgp":
+            external = __external_as__(self.routers[p].bgp)
+            if external in route.as_path:
+                return None
+            return BgpRoute(
+                (__external_as__(bgp),) + route.as_path, (), session.source, "ebgp", r
+            )
+
+        if session.kind == "confed":
+            if self.routers[p].bgp.as_number in route.confed_path:
+                return None
+            return BgpRoute(
+                route.as_path,
+                (bgp.as_number,) + route.confed_path,
+                session.source if local_or_nhs else route.next_hop,
+                "confed",
+                r,
+            )
+
+        if route.learned == "ibgp":
+            # Reflection: client routes go to every peer, others to clients only
+            from_client = route.peer in self.clients[r]
+            originator = route.originator if route.originator >= 0 else route.peer
+            if not (from_client or session.rr_client) or p == originator:
+                return None
+            return BgpRoute(
+                route.as_path,
+                route.confed_path,
+                route.next_hop,
+                "ibgp",
+                r,
+                originator,
+                (__cluster_id__(bgp, r),) + route.cluster_list,
+            )
+
+        return BgpRoute(
+            route.as_path,
+            route.confed_path,
+            session.source if local_or_nhs else route.next_hop,
+            "ibgp",
+            r,
+        )
+
+    # Candidate (selection key, (IGP cost, first hop), route) at p, None when
+    # the route is rejected or its next hop can't be resolved
+    def __receive__(self, p, route, resolve_links):
+        bgp = self.routers[p].bgp
+        if route.originator == p or __cluster_id__(bgp, p) in route.cluster_list:
+            return None
+        resolved = self.__resolve__(p, route.next_hop, resolve_links)
+        if resolved is None:
+            return None
+        key = (
+            len(route.as_path),
+            0 if route.learned == "ebgp" else 1,
+            resolved[0],
+            self.names[route.peer],
+        )
+        return key, resolved, route
+
+    # (IGP cost, first hop) towards a BGP next hop
+    def __resolve__(self, r, next_hop, resolve_links=True):
+        j = self.owner.get(next_hop)
+        if j is None or j == r:
+            return None
+        if self.__connected_network__(r, next_hop) is not None:
+            return 0, j
+        if next_hop == self.loopbacks[j]:
+            return self.igp[r].get(j)
+        if resolve_links:
+            for network in self.connected[j]:
+                if network in self.link_routes and __network__(next_hop, network[1]) == network:
+                    return self.link_routes[network].get(r)
+        return None
+
+    # Network of router i containing `address`, None when it isn't connected
+    def __connected_network__(self, i, address):
+        for network in self.connected[i]:
+            if __network__(address, network[1]) == network:
+                return network
+        return None
+
+    # ==============================
+    # FORWARDING
+    # ==============================
+    # bytes indexed by source router: 1 when its packets reach d's loopback
+    def __reachability__(self, d) -> bytes:
+        count = len(self.routers)
+        forward = [DROPPED] * count
+        router = self.routers[d]
+
+        start, end = self.as_slices[router.as_number]
+        if router.bgp is not None and not self.__ospf_covers__(d, start, end):
+            prefix = f"{__format_address__(self.loopbacks[d])}/128"
+            for r, (_, resolved, _) in self.__bgp_best__([d], prefix).items():
+                if resolved is not None:
+                    forward[r] = resolved[1]
+        # OSPF (distance 110) before iBGP (200), eBGP can't carry our own AS
+        for r in range(start, end):
+            route = self.igp[r].get(d)
+            if route is not None:
+                forward[r] = route[1]
+        forward[d] = DELIVERED
+
+        state = bytearray(count)
+        for source in range(count):
+            path = []
+            r = source
+            while state[r] == UNKNOWN:
+                state[r] = ON_PATH
+                path.append(r)
+                if forward[r] < 0:
+                    break
+                r = forward[r]
+            if forward[r] == DELIVERED:
+                result = REACHABLE
+            elif forward[r] == DROPPED:
+                result = DROPPED_ON_PATH
+            elif state[r] == ON_PATH:
+                result = LOOPING
+            else:
+                result = state[r]  # Joined an already walked path
+            for r in path:
+                state[r] = result
+        return bytes(state)
+
+    # True when the BGP route of d's loopback can only reach routers that
+    # already have an OSPF route to d (it would be overwritten anyway)
+    def __ospf_covers__(self, d, start, end) -> bool:
+        if self.routers[d].as_number not in self.closed_ases:
+            return False
+        return all(
+            r == d or d in self.igp[r] or self.routers[r].bgp is None or not self.up[r]
+            for r in range(start, end)
+        )
+
+    # ==============================
+    # RESULTS
+    # ==============================
+    def reachable(self, source: str, destination: str) -> bool:
+        index = {name: i for i, name in enumerate(self.names)}
+        return self.columns[index[destination]][index[source]] == REACHABLE
+
+    # {(source AS, destination AS): (reachable pairs, pairs)}
+    def as_matrix(self) -> dict:
+        matrix = {}
+        for as_d, (start_d, end_d) in self.as_slices.items():
+            for as_s, (start_s, end_s) in self.as_slices.items():
+                ok = sum(
+                    self.columns[d].count(REACHABLE, start_s, end_s)
+                    for d in range(start_d, end_d)
+                )
+                matrix[(as_s, as_d)] = (ok, (end_s - start_s) * (end_d - start_d))
+        return matrix
+
+    # [(source, destination, reason)] of the unreachable loopbacks
+    def unreachable_pairs(self, limit=None) -> list:
+        pairs = []
+        for d, column in enumerate(self.columns):
+            if column.count(REACHABLE) == len(column):
+                continue
+            for s, state in enumerate(column):
+                if state != REACHABLE:
+                    pairs.append((self.names[s], self.names[d], REASONS[state]))
+                    if limit is not None and len(pairs) >= limit:
+                        return pairs
+        return pairs
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems and not self.sessions_down and all(
+            column.count(REACHABLE) == len(column) for column in self.columns
+        )
+
+    def report(self, verbose=False):
+        count = len(self.routers)
+        reachable = sum(column.count(REACHABLE) for column in self.columns)
+        limit = None if verbose else REPORT_LIMIT
+        print(
+            f"[{'+' if self.ok else '-'}] {count} routers, {reachable}/{count * count} loopback pairs reachable ({100 * reachable / max(1, count * count):.1f} %)"
+        )
+
+        for title, lines in (
+            ("Problems", self.problems),
+            ("BGP sessions down", self.sessions_down),
+        ):
+            if lines:
+                print(f"  {title}: {len(lines)}")
+                for line in lines[:limit]:
+                    print(f"    {line}")
+                if limit is not None and len(lines) > limit:
+                    print(f"    ... ({len(lines) - limit} more, -v to list them all)")
+
+        matrix = self.as_matrix()
+        ases = list(self.as_slices)
+        if len(ases) <= MATRIX_MAX_AS:
+            print("  Reachable pairs, from AS (rows) to AS (columns):")
+            print("    " + "".join(f"{str(a):>12}" for a in [""] + ases))
+            for as_s in ases:
+                cells = [f"{'%d/%d' % matrix[(as_s, as_d)]:>12}" for as_d in ases]
+                print(f"    {str(as_s):>12}" + "".join(cells))
+        else:
+            partial = [(key, value) for key, value in matrix.items() if value[0] != value[1]]
+            print(f"  AS pairs not fully reachable: {len(partial)}")
+            for (as_s, as_d), (ok, total) in partial[:limit]:
+                print(f"    AS {as_s} -> AS {as_d}: {ok}/{total}")
+
+        pairs = self.unreachable_pairs(limit)
+        if pairs:
+            print("  Unreachable loopbacks" + ("" if verbose else f" (first {len(pairs)})") + ":")
+            for source, destination, reason in pairs:
+                print(f"    {source} -> {destination} ({reason})")
+
+
+# Run the simulation over the resolved routers (steps 2 to 4)
+def simulate_routing(routers, verbose=False) -> RoutingSimulation:
+    if verbose:
+        print("\n#Simulation du routage:")
+    return RoutingSimulation(routers).run()
+
+
+def __address__(address: str) -> int:
+    return int(ipaddress.IPv6Address(address.partition("/")[0]))
+
+
+def __network__(address: int, prefixlen: int) -> tuple:
+    return address >> (128 - prefixlen), prefixlen
+
+
+def __format_address__(address: int) -> str:
+    return ipaddress.IPv6Address(address).compressed
+
+
+def __format_network__(network: tuple) -> str:
+    prefix, prefixlen = network
+    return f"{__format_address__(prefix << (128 - prefixlen))}/{prefixlen}"
+
+
+# Same condition as template_router.j2 for `ipv6 ospf 1 area`
+def __ospf_enabled__(interface) -> bool:
+    return (
+        interface.ospf_area is not None
+        and interface.neighbour is not None
+        and ":" not in interface.neighbour
+    )
+
+
+# AS outside the confederation (identifier when the router is a member)
+def __external_as__(bgp) -> str:
+    if bgp.confederation is not None:
+        return bgp.confederation["identifier"]
+    return bgp.as_number
+
+
+# AS number `local` must configure as remote-as for `peer`
+def __as_seen_by__(local, peer) -> str:
+    if (
+        peer.confederation is not None
+        and local.confederation is not None
+        and peer.confederation["identifier"] == local.confederation["identifier"]
+    ):
+        return peer.as_number
+    return __external_as__(peer)
+
+
+def __cluster_id__(bgp, index: int) -> str:
+    return bgp.cluster_id if bgp.cluster_id is not None else f"router-{index}"
+
+
+# {target: (cost, first hop)} from `source` over {i: [(j, cost)]}
+# (pushing a node again only when its tentative cost improves, dense areas
+# such as full meshes would otherwise fill the heap with every edge)
+def __dijkstra__(graph: dict, source: int) -> dict:
+    routes = {}
+    tentative = {source: 0}
+    heap = [(0, source, None)]
+    while heap:
+        cost, node, hop = heapq.heappop(heap)
+        if node in routes:
+            continue
+        routes[node] = (cost, hop)
+        for other, weight in graph.get(node, ()):
+            total = cost + weight
+            if other not in routes and total < tentative.get(other, total + 1):
+                tentative[other] = total
+                heapq.heappush(heap, (total, other, other if hop is None else hop))
+    del routes[source]
+    return routes
+
+
+def main():
+    from intent import load_intent
+    from step1 import step1
+    from step2 import step2
+    from step3 import step3
+    from step4_ospf import step4_ospf
+    from step4_ibgp import step4_ibgp
+
+    data = load_intent("templates/example.yaml")
+    step1(data)
+    routers = step4_ibgp(data, step4_ospf(data, step3(data, step2(data))))
+    simulation = simulate_routing(routers, True)
+    simulation.report(True)
+    return simulation.as_matrix()
+
+
+if __name__ == "__main__":
+    pprint(main())
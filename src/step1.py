@@ -2,110 +2,141 @@
 import ipaddress
 from pprint import pprint
 
+try:
+    from src.allocator import SubnetAllocator, format_address
+    from src.links import as_link_graph
+except ImportError:  # Run as a script from src/
+    from allocator import SubnetAllocator, format_address
+    from links import as_link_graph
 
-def step1(config_data: dict, verbose: bool = False):
-    """Step 1: Assign IPv6 /126 networks to interfaces that don't have addresses configured."""
+
+def step1(config_data: dict, verbose: bool = False, links=None, subnets=None):
+    """Step 1: Assign IPv6 /126 networks to interfaces that don't have addresses configured.
+
+    subnets: link key -> subnet of a previous run (see allocator.read_subnets),
+    kept when still free and replaced in place by the subnets of this run."""
     if verbose:
         print("#STEP 1:")
         print("Assigning networks to interfaces without addresses")
 
-    __assign_networks_across_ases__(config_data)
+    __assign_networks_across_ases__(config_data, links, subnets)
 
     if verbose:
         print("Network assignment completed successfully")
 
 
-def __assign_networks_across_ases__(all_as_data):
+def __assign_networks_across_ases__(all_as_data, links=None, subnets=None):
     """Assign IPv6 /126 networks to interfaces across all ASes that don't have addresses configured."""
     # Handle ASs wrapper
     if "ASs" in all_as_data:
         all_as_data = all_as_data["ASs"]
 
-    # Collect all interfaces needing addresses
-    interfaces_needing_addresses = []
+    links = as_link_graph(all_as_data, links)
+    allocator = SubnetAllocator()
+    as_keys = {str(as_number): as_number for as_number in all_as_data}
 
+    # Reserve the addresses already configured so that generated subnets
+    # never overlap them
     for as_number, as_data in all_as_data.items():
+        if "loopback_space" in as_data:
+            allocator.reserve(as_data["loopback_space"])
+
         networks_space = as_data.get("networks_space")
-        if not networks_space:
+        if networks_space:
+            # Parse the networks space
+            try:
+                allocator.add_pool(as_number, networks_space)
+            except ValueError as e:
+                raise ValueError(
+                    f"Invalid networks_space '{networks_space}' for AS {as_number}: {e}"
+                )
+
+        for router_data in as_data["routers"].values():
+            for interface_data in router_data["interfaces"].values():
+                for address in interface_data.get("addresses", []):
+                    allocator.reserve(address)
+
+    # Links needing addresses, with the networks_space used for them (the one
+    # of the first endpoint that has one) and a key identifying the link
+    connections = {}
+    for link in links.links:
+        missing = [endpoint for endpoint in link if "addresses" not in endpoint[2]]
+        if not missing:
             continue
 
-        # Parse the networks space
-        try:
-            network = ipaddress.IPv6Network(networks_space)
-        except ipaddress.AddressValueError as e:
+        pools = [
+            as_keys[as_number]
+            for as_number in (endpoint[0].split(":")[0] for endpoint in link)
+            if as_keys[as_number] in allocator.pools
+        ]
+        if not pools:
+            continue  # No networks_space on either side
+        if len(missing) != 2:
             raise ValueError(
-                f"Invalid networks_space '{networks_space}' for AS {as_number}: {e}"
+                f"Link {link[0][0]}:{link[0][1]} - {link[1][0]}:{link[1][1]} has addresses on one side only"
             )
 
-        for router_name, router_data in as_data["routers"].items():
-            for interface_name, interface_data in router_data["interfaces"].items():
-                if "addresses" not in interface_data:
-                    interfaces_needing_addresses.append(
-                        {
-                            "as_number": as_number,
-                            "router": router_name,
-                            "interface": interface_name,
-                            "neighbour": interface_data["neighbour"],
-                            "interface_data": interface_data,
-                            "networks_space": network,
-                        }
-                    )
-
-    # Group interfaces by connection (bidirectional)
-    connections = {}
-    for iface in interfaces_needing_addresses:
-        neighbour = iface["neighbour"]
-        # Normalize neighbour to full format (AS:Router)
-        if ":" not in neighbour:
-            # Same AS, add AS number
-            neighbour = f"{iface['as_number']}:{neighbour}"
-
-        # Create full identifiers for both sides
-        local_id = f"{iface['as_number']}:{iface['router']}"
-        remote_id = neighbour
-
-        # Sort to ensure consistent key regardless of which side we process first
-        connection_key = tuple(sorted([local_id, remote_id]))
-        if connection_key not in connections:
-            connections[connection_key] = []
-        connections[connection_key].append(iface)
-
-    # Assign /126 subnets to each connection
-    subnet_index = 0
-    for connection_key, interfaces in connections.items():
-        if len(interfaces) != 2:
+        # Sort to ensure consistent key regardless of which side we process first,
+        # parallel links between the same routers get a suffix
+        connection_key = "-".join(sorted([link[0][0], link[1][0]]))
+        suffix = 0
+        while (connection_key, suffix) in connections:
+            suffix += 1
+        connections[(connection_key, suffix)] = (pools[0], link)
+
+    # Check that every pool is large enough before allocating anything
+    links_per_pool = {}
+    for pool, _ in connections.values():
+        links_per_pool[pool] = links_per_pool.get(pool, 0) + 1
+
+    for pool, count in links_per_pool.items():
+        if count > allocator.capacity(pool):
             raise ValueError(
-                f"Connection {connection_key} has {len(interfaces)} interfaces, expected 2"
+                f"networks_space of AS {pool} is too small: {count} links for {allocator.capacity(pool)} /126 subnets"
             )
 
-        # Use the networks_space from the first interface (they should be from same AS or compatible)
-        network = interfaces[0]["networks_space"]
-
-        # Generate /126 subnet
-        subnet = ipaddress.IPv6Network(
-            (network.network_address + subnet_index * 4, 126)
-        )
-        subnet_index += 1
-
-        # Assign addresses to the two interfaces
-        addresses = [
-            str(subnet[1]),
-            str(subnet[2]),
-        ]  # Use .1 and .2, skip .0 (network) and .3 (broadcast)
-
-        for i, iface in enumerate(interfaces):
-            iface["interface_data"]["addresses"] = [f"{addresses[i]}/126"]
+    # Assign /126 subnets to each connection, first-fit in sorted key order
+    # within each pool. The links of the previous run keep their subnet before
+    # the new ones are placed, so adding a link does not renumber the others
+    previous = subnets if subnets is not None else {}
+    assigned = {}
+    pending = []
+    for connection_key, suffix in sorted(connections.keys()):
+        pool, link = connections[(connection_key, suffix)]
+        key = connection_key if suffix == 0 else f"{connection_key}#{suffix}"
+        subnet = __parse_subnet__(previous.get(key))
+        if subnet is not None and allocator.keep(pool, subnet):
+            assigned[key] = (subnet, link)
+        else:
+            pending.append((key, pool, link))
+
+    for key, pool, link in pending:
+        assigned[key] = (allocator.allocate(pool), link)
+
+    for subnet, link in assigned.values():
+        # Use .1 and .2, skip .0 (network) and .3 (broadcast)
+        for i, (_, _, interface_data) in enumerate(link):
+            interface_data["addresses"] = [f"{format_address(subnet + i + 1)}/126"]
+
+    if subnets is not None:
+        subnets.clear()
+        for key, (subnet, _) in sorted(assigned.items()):
+            subnets[key] = f"{format_address(subnet)}/126"
+
+
+# Network address (as an int) of a subnet read from a previous run
+def __parse_subnet__(value):
+    try:
+        return int(ipaddress.IPv6Network(value).network_address)
+    except (ValueError, TypeError):
+        return None
 
 
 def main():
-    import yaml
+    from intent import load_intent
 
     # Load config and run step1
-    with open("templates/example.yaml", "r") as f:
-        data = yaml.safe_load(f)
-
-    if "ASs" in data:
-        data = data["ASs"]
+    data = load_intent("templates/example.yaml")
     data = {int(k): v for k, v in data.items()}
 
     step1(data, verbose=True)
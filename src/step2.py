@@ -2,11 +2,17 @@
 import ipaddress
 from pprint import pprint
 
+try:
+    from src.model import Interface, Router
+    from src.registry import RouterRegistry, iter_ases
+except ImportError:  # Run as a script from src/
+    from model import Interface, Router
+    from registry import RouterRegistry, iter_ases
 
-# Parse yaml config data and transform it to match the output structure
-def step2(data: dict, verbose: bool = False) -> list:
-    routers = []
 
+# Parse yaml config data and transform it to match the output structure
+# as_numbers restricts the processing to some ASes (all of them by default)
+def step2(data: dict, verbose: bool = False, as_numbers=None) -> RouterRegistry:
     if verbose:
         print("\n#STEP 2: ")
         print("Processing config...")
@@ -14,7 +20,8 @@ def step2(data: dict, verbose: bool = False) -> list:
     if "ASs" in data:
         data = data["ASs"]
 
-    for an, a in data.items():
+    routers = RouterRegistry(intent=data)
+    for an, a in iter_ases(data, as_numbers):
         __process_as__(routers, an, a)
 
     if verbose:
@@ -29,41 +36,32 @@ def __process_as__(routers, as_number, as_data):
     # RIP is configured per interface, so in this step but in the __process_interface__ function
     # iBGP is configured in this stage, but we aren't sure how yet since it hasn't been implemented yet
     igp = as_data["igp"]
+    loopback_base = ipaddress.IPv6Network(as_data["loopback_space"])[0]
 
     for i, (ri, r) in enumerate(as_data["routers"].items()):
-        # Add hostname (as:router_id) and computed loopback from loopback_space
-        router = {
-            "hostname": f"{as_number}:{ri}",
-            "loopback": {
-                "ipv6": str(ipaddress.IPv6Network(as_data["loopback_space"])[0] + i + 1)
-            },
-        }
-
-        # Add interfaces
-        interfaces = []
-        for int_name, int_data in r["interfaces"].items():
-            interface = __process_interface__(int_name, int_data, igp)
-            interfaces.append(interface)
-
-        router["interfaces"] = interfaces
-
-        # Add ospf config if it is enabled
-        if igp == "ospf":
-            router["ospf"] = {"router_id": ri}
+        # Add hostname (as:router_id), computed loopback from loopback_space,
+        # interfaces and ospf config if it is enabled
+        router = Router(
+            as_number,
+            ri,
+            loopback=str(loopback_base + i + 1),
+            interfaces=[
+                __process_interface__(int_name, int_data, igp)
+                for int_name, int_data in r["interfaces"].items()
+            ],
+            ospf=igp == "ospf",
+        )
 
         routers.append(router)
 
 
-def __process_interface__(int_name, int_data, igp) -> dict:
-    interface = {
-        "name": int_name,
-        "ipv6_enable": True,
-        "rip_enable": igp == "rip",
-        "ipv6_addresses": int_data["addresses"],
-        "neighbour": int_data["neighbour"],
-    }
-
-    return interface
+def __process_interface__(int_name, int_data, igp) -> Interface:
+    return Interface(
+        name=int_name,
+        ipv6_addresses=int_data["addresses"],
+        neighbour=int_data["neighbour"],
+        rip_enable=igp == "rip",
+    )
 
 
 def main():
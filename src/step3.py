@@ -1,16 +1,29 @@
 #!/usr/bin/env python3
 from pprint import pprint
 
+try:
+    from src.links import as_link_graph
+    from src.model import Bgp, BgpNeighbour
+    from src.registry import as_registry, iter_ases
+except ImportError:  # Run as a script from src/
+    from links import as_link_graph
+    from model import Bgp, BgpNeighbour
+    from registry import as_registry, iter_ases
+
 
 # Add BGP configuration (yaml config left in each interface, as neighbour and bgp keys)
-def step3(data: dict, routers: list, verbose: bool = False):
+def step3(
+    data: dict, routers: list, verbose: bool = False, as_numbers=None, links=None
+):
     if verbose:
         print("\n#STEP 3:")
         print("Generating BGP config")
 
-    bgp = __extract_bgp_config__(data)
+    routers = as_registry(routers)
+    links = as_link_graph(data, links)
+    bgp = __extract_bgp_config__(data, as_numbers)
     __apply_bgp_config__(routers, bgp)
-    __resolve_neighbours_ips__(data, routers)
+    __resolve_neighbours_ips__(routers, links, bgp)
 
     if verbose:
         print("BGP config generated successfully")
@@ -18,10 +31,11 @@ def step3(data: dict, routers: list, verbose: bool = False):
     return routers
 
 
-def __extract_bgp_config__(data: dict) -> dict:
+# {hostname: [names of its eBGP interfaces]}
+def __extract_bgp_config__(data: dict, as_numbers=None) -> dict:
     bgp = {}
 
-    for aid, a in data.items():
+    for aid, a in iter_ases(data, as_numbers):
         for rid, r in a["routers"].items():
             __proccess_router__(bgp, aid, rid, r)
 
@@ -29,61 +43,53 @@ def __extract_bgp_config__(data: dict) -> dict:
 
 
 def __proccess_router__(bgp: dict, as_number: int, router_id: str, router: dict):
-    for interface in router["interfaces"].values():
+    for name, interface in router["interfaces"].items():
         if "bgp" not in interface:
-            return
-
-        hostname = f"{as_number}:{router_id}"
-
-        # This host already has one neighbour
-        if hostname in bgp.keys():
-            bgp[hostname].append(interface["neighbour"])
             continue
 
-        bgp[hostname] = [interface["neighbour"]]
+        hostname = f"{as_number}:{router_id}"
+        bgp.setdefault(hostname, []).append(name)
 
 
 def __apply_bgp_config__(routers: list, bgp: dict) -> list:
-    for router in routers:
-        if router["hostname"] in bgp.keys():
-            hostname = router["hostname"]
-            current_as, current_router_id = hostname.split(":")
-
-            router["bgp"] = {
-                "as": current_as,
-                "router_id": current_router_id,
-                "neighbours": bgp[hostname],
-            }
+    for hostname in bgp.keys():
+        router = routers.get(hostname)
+        router.bgp = Bgp(router.as_number, router.router_id)
 
     return routers
 
 
-def __resolve_neighbours_ips__(data: dict, routers: list):
-    for current_router in routers:
-        if "bgp" not in current_router:
-            continue
-
-        neighbours = current_router["bgp"]["neighbours"]
-        for i in range(len(neighbours)):
-            neighbour_as_number = neighbours[i].split(":")[0]
-            neighbours[i] = {
-                "address": {"ipv6": __resolve_neighbour_ip__(
-                    data, neighbours[i], current_router["hostname"]
-                )[0]},  # Pick the first ip in the list
-                "remote_as": neighbour_as_number,
-            }
-
-
-def __resolve_neighbour_ip__(
-    data: dict, neighbour: str, current_router_id: str
-) -> list:
-    neighbour_as_number, neighbour_router_id = neighbour.split(":")
-
-    for interface in data[int(neighbour_as_number)]["routers"][neighbour_router_id][
-        "interfaces"
-    ].values():  # Loop over the interfaces of our desired router
-        if interface["neighbour"] == current_router_id:
-            return interface["addresses"]
+# Each eBGP interface is resolved with a lookup in the link graph (built in
+# one pass), unresolvable peers are all reported at once
+def __resolve_neighbours_ips__(routers: list, links, bgp: dict):
+    errors = []
+    for hostname, interface_names in bgp.items():
+        neighbours = routers.get(hostname).bgp.neighbours
+        for name in interface_names:
+            remote = links.peer(hostname, name)
+            if remote is None:
+                errors.append(f"{hostname}:{name} has no peer interface")
+                continue
+
+            neighbour, remote_int_name, remote_interface = remote
+            addresses = remote_interface.get("addresses")
+            if not addresses:
+                errors.append(
+                    f"{hostname}:{name} peer {neighbour}:{remote_int_name} has no address"
+                )
+                continue
+
+            neighbours.append(
+                BgpNeighbour(
+                    addresses[0],  # Pick the first ip in the list
+                    neighbour.partition(":")[0],
+                )
+            )
+
+    if errors:
+        raise ValueError(
+            f"{len(errors)} unresolvable BGP neighbour(s):\n  " + "\n  ".join(errors)
+        )
 
 
 def main():
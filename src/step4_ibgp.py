@@ -1,58 +1,84 @@
 #!/usr/bin/env python3
+import math
 from pprint import pprint
 
+try:
+    from src.links import as_link_graph
+    from src.model import Bgp, BgpNeighbour
+    from src.registry import as_registry, iter_ases
+except ImportError:  # Run as a script from src/
+    from links import as_link_graph
+    from model import Bgp, BgpNeighbour
+    from registry import as_registry, iter_ases
 
-def step4_ibgp(data: dict, routers: list, verbose: bool = False):
+
+IBGP_TOPOLOGIES = ["full-mesh", "route-reflector", "confederation"]
+DEFAULT_ROUTE_REFLECTOR_COUNT = 2
+CONFEDERATION_BASE_AS = 65000
+
+
+def step4_ibgp(
+    data: dict, routers: list, verbose: bool = False, as_numbers=None, links=None
+):
     if verbose:
         print("\n#STEP 4 iBGP:")
         print("Configuring iBGP")
 
-    for as_number, as_data in data.items():
+    routers = as_registry(routers)
+    links = as_link_graph(data, links)
+
+    for as_number, as_data in iter_ases(data, as_numbers):
         if as_data.get("igp") != "ibgp":
             continue
 
+        topology = as_data.get("ibgp_topology", "full-mesh")
+        if topology not in IBGP_TOPOLOGIES:
+            raise ValueError(
+                f"Invalid ibgp_topology '{topology}' for AS {as_number}, expected one of {IBGP_TOPOLOGIES}"
+            )
+
         if verbose:
-            print(f"Configuring iBGP for AS {as_number}")
+            print(f"Configuring iBGP for AS {as_number} ({topology})")
 
-        as_num = int(as_number)
         router_ids = list(as_data["routers"].keys())
 
-        # Get loopbacks
+        # Get loopbacks, make sure every router has a bgp section and
+        # index already known neighbours (eBGP from step3) in a set
         loopbacks = {}
+        known = {}
         for ri in router_ids:
-            router = next(r for r in routers if r["hostname"] == f"{as_number}:{ri}")
-            loopbacks[ri] = router["loopback"]["ipv6"]
+            router = routers.get(f"{as_number}:{ri}")
+            loopbacks[ri] = router.loopback
 
-        for router_id in router_ids:
-            current_hostname = f"{as_number}:{router_id}"
-            current_router = next(
-                r for r in routers if r["hostname"] == current_hostname
-            )
+            if router.bgp is None:
+                router.bgp = Bgp(str(int(as_number)), ri)
+            known[ri] = {(n.address, n.remote_as) for n in router.bgp.neighbours}
 
-            if "bgp" not in current_router:
-                current_router["bgp"] = {
-                    "as": str(as_num),
-                    "router_id": router_id,
-                    "neighbours": [],
-                }
-
-            # Add all other routers as neighbours
-            for other_ri in router_ids:
-                if other_ri == router_id:
-                    continue
-                other_loopback = loopbacks[other_ri]
-                neighbour = {
-                    "address": {"ipv6": other_loopback},
-                    "remote_as": str(as_num),
-                }
-                if neighbour not in current_router["bgp"]["neighbours"]:
-                    current_router["bgp"]["neighbours"].append(neighbour)
-                    
-            # Add next-hop-self to border routers
-            remote_ass = [n["remote_as"] for n in current_router["bgp"]["neighbours"]]
-            current_as = current_router["hostname"].split(":")[0]
-            if current_as in remote_ass and len(remote_ass) > 1:
-                current_router["bgp"]["next_hop_self"] = True
+        session = IbgpSessions(routers, links, as_number, loopbacks, known)
+        if topology == "full-mesh":
+            __full_mesh__(session, router_ids, str(int(as_number)))
+        elif topology == "route-reflector":
+            __route_reflectors__(session, as_data, router_ids)
+        else:
+            __confederation__(session, as_data, router_ids)
+
+        # Add next-hop-self to border routers. In a confederation only the
+        # routers with an eBGP neighbour outside the AS get it (and the template
+        # keeps the next hop on confederation sessions): a next hop rewritten at
+        # every sub-AS border can point back through the router forwarding to
+        # it, creating forwarding loops
+        for router_id in router_ids:
+            bgp = routers.get(f"{as_number}:{router_id}").bgp
+            remote_ass = {n.remote_as for n in bgp.neighbours}
+            if topology == "confederation":
+                border = any(
+                    n.remote_as != bgp.as_number and not n.confederation_peer
+                    for n in bgp.neighbours
+                )
+            else:
+                border = len(bgp.neighbours) > 1
+            if bgp.as_number in remote_ass and border:
+                bgp.next_hop_self = True
 
     if verbose:
         print("iBGP configured successfully")
@@ -60,6 +86,166 @@ def step4_ibgp(data: dict, routers: list, verbose: bool = False):
     return routers
 
 
+# Small helper holding what is needed to add iBGP sessions inside one AS
+class IbgpSessions:
+    def __init__(self, routers, links, as_number, loopbacks: dict, known: dict):
+        self.routers = routers
+        self.links = links
+        self.as_number = as_number
+        self.loopbacks = loopbacks
+        self.known = known
+
+    # Add `other_id` as a neighbour of `router_id` (O(1) duplicate check)
+    def add(self, router_id: str, other_id: str, remote_as: str, **options):
+        key = (self.loopbacks[other_id], remote_as)
+        if key in self.known[router_id]:
+            return
+        self.known[router_id].add(key)
+
+        router = self.routers.get(f"{self.as_number}:{router_id}")
+        router.bgp.neighbours.append(BgpNeighbour(key[0], remote_as, **options))
+
+    # Ids of the routers of the same AS linked to `router_id` (one per link)
+    def intra_as_neighbours(self, router_id: str, interfaces: dict) -> list:
+        hostname = f"{self.as_number}:{router_id}"
+        prefix = f"{self.as_number}:"
+        neighbours = []
+        for name in interfaces:
+            remote = self.links.peer(hostname, name)
+            if remote is not None and remote[0].startswith(prefix):
+                neighbours.append(remote[0].split(":")[1])
+        return neighbours
+
+
+def __full_mesh__(session: IbgpSessions, router_ids: list, remote_as: str):
+    for router_id in router_ids:
+        for other_id in router_ids:
+            if other_id != router_id:
+                session.add(router_id, other_id, remote_as)
+
+
+# Route reflectors are fully meshed, each client only peers with the
+# reflectors of its cluster
+def __route_reflectors__(session: IbgpSessions, as_data: dict, router_ids: list):
+    remote_as = str(int(session.as_number))
+    clusters = __select_clusters__(session, as_data, router_ids)
+
+    reflectors = [rr for cluster in clusters.values() for rr in cluster]
+    __full_mesh__(session, reflectors, remote_as)
+
+    for cluster_id, cluster_reflectors in clusters.items():
+        if cluster_id is None:
+            continue
+        for rr in cluster_reflectors:
+            router = session.routers.get(f"{session.as_number}:{rr}")
+            router.bgp.cluster_id = cluster_id
+
+    # Clients without an explicit cluster are spread over the clusters
+    cluster_ids = list(clusters.keys())
+    is_reflector = set(reflectors)
+    clients = [ri for ri in router_ids if ri not in is_reflector]
+    for i, client in enumerate(clients):
+        # rr_cluster references are checked by validate.py
+        cluster_id = as_data["routers"][client].get("rr_cluster")
+        if cluster_id is None:
+            cluster_id = cluster_ids[i % len(cluster_ids)]
+
+        for rr in clusters[cluster_id]:
+            session.add(client, rr, remote_as)
+            session.add(rr, client, remote_as, route_reflector_client=True)
+
+
+# Returns {cluster_id: [route reflector ids]}, cluster_id is None when the
+# reflectors keep their default cluster-id (their router-id)
+def __select_clusters__(session: IbgpSessions, as_data: dict, router_ids: list) -> dict:
+    explicit = as_data.get("route_reflectors")
+
+    if explicit is None:
+        count = as_data.get("route_reflector_count", DEFAULT_ROUTE_REFLECTOR_COUNT)
+        degrees = __intra_as_degrees__(session, as_data)
+        ranked = sorted(
+            range(len(router_ids)), key=lambda i: (-degrees[router_ids[i]], i)
+        )
+        return {None: [router_ids[i] for i in ranked[:count]]}  # count > 0, checked by validate.py
+
+    if isinstance(explicit, dict):
+        return {cid: list(rrs) for cid, rrs in explicit.items()}
+    return {None: list(explicit)}
+
+
+# Number of links of each router towards routers of the same AS
+def __intra_as_degrees__(session: IbgpSessions, as_data: dict) -> dict:
+    return {
+        ri: len(session.intra_as_neighbours(ri, r["interfaces"]))
+        for ri, r in as_data["routers"].items()
+    }
+
+
+# The AS is split into member sub-ASes: full mesh inside a sub-AS and
+# confederation eBGP sessions (over loopbacks) on links between sub-ASes
+def __confederation__(session: IbgpSessions, as_data: dict, router_ids: list):
+    as_number = session.as_number
+    members = __select_confederation__(session, as_data, router_ids)
+
+    sub_as_of = {}
+    for sub_as, member_ids in members.items():
+        for ri in member_ids:
+            sub_as_of[ri] = str(sub_as)
+    sub_ases = [str(sub_as) for sub_as in members.keys()]
+
+    for ri in router_ids:
+        bgp = session.routers.get(f"{as_number}:{ri}").bgp
+        bgp.as_number = sub_as_of[ri]
+        bgp.confederation = {
+            "identifier": str(int(as_number)),
+            "peers": [sub_as for sub_as in sub_ases if sub_as != sub_as_of[ri]],
+        }
+
+    for member_ids in members.values():
+        __full_mesh__(session, member_ids, sub_as_of[member_ids[0]])
+
+    for ri in router_ids:
+        interfaces = as_data["routers"][ri]["interfaces"]
+        for other in session.intra_as_neighbours(ri, interfaces):
+            if sub_as_of[other] != sub_as_of[ri]:
+                session.add(ri, other, sub_as_of[other], confederation_peer=True)
+
+
+# Returns {sub_as: [router ids]}, either from the intent or by cutting the
+# AS in contiguous chunks (breadth-first over intra-AS links)
+def __select_confederation__(session: IbgpSessions, as_data: dict, router_ids: list) -> dict:
+    explicit = as_data.get("confederation")
+
+    # Every router is in exactly one sub-AS (checked by validate.py)
+    if explicit is not None:
+        return {int(sub_as): list(ids) for sub_as, ids in explicit.items()}
+
+    size = as_data.get("confederation_size") or max(1, math.isqrt(len(router_ids)))
+    adjacency = {
+        ri: session.intra_as_neighbours(ri, as_data["routers"][ri]["interfaces"])
+        for ri in router_ids
+    }
+
+    order = []
+    visited = set()
+    for start in router_ids:
+        if start in visited:
+            continue
+        visited.add(start)
+        queue = [start]
+        for ri in queue:
+            order.append(ri)
+            for other in adjacency[ri]:
+                if other not in visited:
+                    visited.add(other)
+                    queue.append(other)
+
+    return {
+        CONFEDERATION_BASE_AS + i // size + 1: order[i : i + size]
+        for i in range(0, len(order), size)
+    }
+
+
 # The hostname could be either "router_id" or "as_number:router_id"
 def __get_id_from_hostname__(hostname: str) -> str:
     return hostname if ":" not in hostname else hostname.split(":")[1]
@@ -1,13 +1,25 @@
 #!/usr/bin/env python3
 from pprint import pprint
 
+try:
+    from src.links import as_link_graph
+    from src.registry import as_registry, iter_ases
+except ImportError:  # Run as a script from src/
+    from links import as_link_graph
+    from registry import as_registry, iter_ases
 
-def step4_ospf(data: dict, routers: list, verbose: bool = False):
+
+def step4_ospf(
+    data: dict, routers: list, verbose: bool = False, as_numbers=None, links=None
+):
     if verbose:
         print("\n#STEP 4:")
         print("Processing OSPF metrics")
 
-    for as_number, as_data in data.items():
+    routers = as_registry(routers)
+    links = as_link_graph(data, links)
+
+    for as_number, as_data in iter_ases(data, as_numbers):
         if as_data.get("igp") not in ["ospf", "ibgp"]:
             continue
 
@@ -15,39 +27,20 @@ def step4_ospf(data: dict, routers: list, verbose: bool = False):
             print(f"Processing OSPF for AS {as_number}")
 
         for router_id, router_data in as_data["routers"].items():
+            current_hostname = f"{as_number}:{router_id}"
+
             for interface_name, interface_data in router_data["interfaces"].items():
                 if "ospf_metric" not in interface_data:
                     continue  # Skip interfaces without OSPF metric defined
 
-                # Find neighbour hostname
-                neighbour_hostname = interface_data["neighbour"]
-                if ":" not in neighbour_hostname:
-                    neighbour_hostname = f"{as_number}:{neighbour_hostname}"
-
-                # Find neighbour router in data
-                neighbour_as, neighbour_rid = neighbour_hostname.split(":")
-                neighbour_as_data = data[int(neighbour_as)]
-                neighbour_router_data = neighbour_as_data["routers"][neighbour_rid]
-
-                # Find the neighbour interface in data
-                current_hostname = f"{as_number}:{router_id}"
-                neighbour_metric = None
-                neighbour_int_name = None
-                for n_int_name, n_int_data in neighbour_router_data[
-                    "interfaces"
-                ].items():
-                    n_neighbour = n_int_data["neighbour"]
-                    if ":" not in n_neighbour:
-                        n_neighbour = f"{neighbour_as}:{n_neighbour}"
-                    if n_neighbour == current_hostname:
-                        neighbour_metric = n_int_data.get("ospf_metric")
-                        neighbour_int_name = n_int_name
-                        break
-
-                if neighbour_int_name is None:
+                # Find the neighbour interface at the other end of the link
+                peer = links.peer(current_hostname, interface_name)
+                if peer is None:
                     raise ValueError(
                         f"Cannot find neighbour interface for {current_hostname}:{interface_name}"
                     )
+                neighbour_hostname, neighbour_int_name, neighbour_int_data = peer
+                neighbour_metric = neighbour_int_data.get("ospf_metric")
 
                 current_metric = interface_data["ospf_metric"]
 
@@ -62,45 +55,28 @@ def step4_ospf(data: dict, routers: list, verbose: bool = False):
                 )
 
                 # Add to routers
-                # Find current router
-                current_router = next(
-                    r for r in routers if r["hostname"] == current_hostname
-                )
-                current_interface = next(
-                    i
-                    for i in current_router["interfaces"]
-                    if i["name"] == interface_name
-                )
-                if "bgp" not in current_router:
-                    current_interface["ospf_metric"] = metric_to_set
+                current_router = routers.get(current_hostname)
+                if current_router.bgp is None:
+                    current_interface = routers.interface(
+                        current_hostname, interface_name
+                    )
+                    current_interface.ospf_metric = metric_to_set
 
-                # Find neighbour router
-                neighbour_router = next(
-                    r for r in routers if r["hostname"] == neighbour_hostname
-                )
-                neighbour_interface = next(
-                    i
-                    for i in neighbour_router["interfaces"]
-                    if (
-                        i["neighbour"]
-                        if ":" in i["neighbour"]
-                        else f"{neighbour_as}:{i['neighbour']}"
+                neighbour_router = routers.get(neighbour_hostname)
+                if neighbour_router.bgp is None:
+                    neighbour_interface = routers.interface(
+                        neighbour_hostname, neighbour_int_name
                     )
-                    == current_hostname
-                )
-                if "bgp" not in neighbour_router:
-                    neighbour_interface["ospf_metric"] = metric_to_set
+                    neighbour_interface.ospf_metric = metric_to_set
 
     # Add ospf_area to interfaces for routers without bgp in OSPF ASes
     for router in routers:
-        as_num, r_id = router["hostname"].split(":")
-        as_num = int(as_num)
+        as_num = int(router.as_number)
         if data[as_num].get("igp") in ["ospf", "ibgp"]:
-            for interface in router["interfaces"]:
-                orig_int_data = data[as_num]["routers"][r_id]["interfaces"][
-                    interface["name"]
-                ]
-                interface["ospf_area"] = orig_int_data.get("ospf_area", 0)
+            orig_interfaces = data[as_num]["routers"][router.router_id]["interfaces"]
+            for interface in router.interfaces:
+                orig_int_data = orig_interfaces[interface.name]
+                interface.ospf_area = orig_int_data.get("ospf_area", 0)
 
     if verbose:
         print("OSPF metrics processed successfully")
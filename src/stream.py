@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+from pprint import pprint
+
+try:
+    from src.links import as_link_graph
+    from src.step1 import step1
+    from src.step2 import step2
+    from src.step3 import step3
+    from src.step4_ospf import step4_ospf
+    from src.step4_ibgp import step4_ibgp
+except ImportError:  # Run as a script from src/
+    from links import as_link_graph
+    from step1 import step1
+    from step2 import step2
+    from step3 import step3
+    from step4_ospf import step4_ospf
+    from step4_ibgp import step4_ibgp
+
+
+# Streaming mode: steps 2 to 4 are run one AS at a time and each router is
+# yielded as soon as its AS is resolved (the iBGP sessions need every loopback
+# of the AS). Routers of other ASes are read from the intent when needed
+# (eBGP neighbour addresses), so the full router list is never built.
+def stream_routers(data: dict, verbose: bool = False, links=None, subnets=None):
+    links = as_link_graph(data, links)
+    step1(data, verbose, links, subnets)
+
+    if verbose:
+        print("\n#STEP 2-4 (streaming):")
+
+    for as_number in list(data.keys()):
+        routers = resolve_as(data, as_number, links)
+
+        if verbose:
+            print(f"AS {as_number}: {len(routers)} routers resolved")
+
+        yield from routers
+
+
+# Steps 2 to 4 for the routers of one AS (step1 must already have been run)
+def resolve_as(data: dict, as_number, links):
+    as_numbers = [as_number]
+    routers = step2(data, False, as_numbers)
+    routers = step3(data, routers, False, as_numbers, links)
+    routers = step4_ospf(data, routers, False, as_numbers, links)
+    return step4_ibgp(data, routers, False, as_numbers, links)
+
+
+def main():
+    from intent import load_intent
+
+    data = load_intent("templates/example.yaml")
+
+    for router in stream_routers(data, verbose=True):
+        pprint(router)
+
+
+if __name__ == "__main__":
+    main()
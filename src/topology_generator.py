@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import argparse
+import random
+
+import yaml
+
+TOPOLOGIES = ["linear", "ring", "full-mesh", "clos", "multi-as"]
+# Routers are numbered R1 to Rn, the template derives their router-id
+# 1.1.X.Y from that number (see Router.ipv4_router_id)
+MAX_ROUTERS = 255 * 256 - 1
+# Spines of the "clos" layout: every leaf is connected to every spine, so the
+# number of links grows linearly with the number of routers
+DEFAULT_SPINES = 4
+
+
+# Build a synthetic intent (same format as templates/example.yaml)
+# - topology: one of TOPOLOGIES, "multi-as" chains `ases` ASes with eBGP links
+#   between consecutive ones, each AS being a ring
+# - igps: IGP of each AS, cycled when there are more ASes than IGPs
+# - spines: number of spines of the "clos" layout
+def generate_intent(
+    topology: str = "ring",
+    routers: int = 10,
+    ases: int = 1,
+    igps=("ospf",),
+    seed: int = 0,
+    spines: int = DEFAULT_SPINES,
+) -> dict:
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}', expected one of {TOPOLOGIES}")
+    if routers > MAX_ROUTERS:
+        raise ValueError(f"Too many routers ({routers}), at most {MAX_ROUTERS} get a valid router-id")
+    if topology != "multi-as":
+        ases = 1
+
+    rng = random.Random(seed)
+    intent = {}
+    per_as = max(1, routers // ases)
+    next_router = 1
+
+    for k in range(ases):
+        as_number = 100 + k
+        igp = igps[k % len(igps)]
+        count = per_as if k < ases - 1 else max(1, routers - per_as * (ases - 1))
+        router_ids = [f"R{next_router + i}" for i in range(count)]
+        next_router += count
+
+        intent[as_number] = {
+            "igp": igp,
+            "loopback_space": f"2001:{k + 1:x}::/64",
+            "networks_space": f"2001:db8:{k + 1:x}::/48",
+            "routers": {ri: {"interfaces": {}} for ri in router_ids},
+        }
+
+        layout = "ring" if topology == "multi-as" else topology
+        for a, b in __links__(layout, router_ids, spines):
+            metric = rng.choice([10, 20, 50, 100]) if igp in ["ospf", "ibgp"] else None
+            __connect__(intent, as_number, a, as_number, b, metric=metric)
+
+    # eBGP borders between consecutive ASes
+    as_numbers = list(intent.keys())
+    for left, right in zip(as_numbers, as_numbers[1:]):
+        a = list(intent[left]["routers"].keys())[-1]
+        b = list(intent[right]["routers"].keys())[0]
+        __connect__(intent, left, a, right, b, bgp=True)
+
+    return intent
+
+
+# Pairs of router ids to connect
+def __links__(topology: str, router_ids: list, spines: int = DEFAULT_SPINES) -> list:
+    n = len(router_ids)
+
+    if topology == "linear":
+        return [(router_ids[i], router_ids[i + 1]) for i in range(n - 1)]
+
+    if topology == "ring":
+        if n < 3:
+            return __links__("linear", router_ids)
+        return [(router_ids[i], router_ids[(i + 1) % n]) for i in range(n)]
+
+    if topology == "full-mesh":
+        return [(router_ids[i], router_ids[j]) for i in range(n) for j in range(i + 1, n)]
+
+    # Clos (leaf/spine): `spines` spines (at least one leaf is kept), every
+    # leaf connected to every spine
+    spine_ids = router_ids[: max(1, min(spines, n - 1))]
+    leaves = router_ids[len(spine_ids):]
+    return [(leaf, spine) for leaf in leaves for spine in spine_ids]
+
+
+def __connect__(intent, as_a, a, as_b, b, metric=None, bgp=False):
+    for (as_local, local), (as_remote, remote) in [((as_a, a), (as_b, b)), ((as_b, b), (as_a, a))]:
+        interfaces = intent[as_local]["routers"][local]["interfaces"]
+        interface = {
+            "neighbour": remote if as_local == as_remote else f"{as_remote}:{remote}"
+        }
+        if metric is not None:
+            interface["ospf_metric"] = metric
+        if bgp:
+            interface["bgp"] = "peer"
+
+        interfaces[f"GigabitEthernet{len(interfaces)}/0"] = interface
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic intent file.")
+    parser.add_argument("-t", "--topology", choices=TOPOLOGIES, default="ring")
+    parser.add_argument("-r", "--routers", type=int, default=10)
+    parser.add_argument("-a", "--ases", type=int, default=1, help="Number of ASes (multi-as)")
+    parser.add_argument("-i", "--igp", default="ospf", help="Comma separated IGPs, cycled per AS")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-s", "--spines", type=int, default=DEFAULT_SPINES, help="Number of spines (clos)"
+    )
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+    if args.routers > MAX_ROUTERS:
+        parser.error(f"at most {MAX_ROUTERS} routers (-r), their router-ids would be invalid")
+
+    intent = generate_intent(
+        args.topology, args.routers, args.ases, args.igp.split(","), args.seed, args.spines
+    )
+    dumped = yaml.safe_dump(intent, sort_keys=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(dumped)
+    else:
+        print(dumped)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+import ipaddress
+from pprint import pprint
+
+try:
+    from src.allocator import SUBNET_SIZE, pool_capacity
+    from src.links import LinkGraph
+    from src.step4_ibgp import IBGP_TOPOLOGIES
+except ImportError:  # Run as a script from src/
+    from allocator import SUBNET_SIZE, pool_capacity
+    from links import LinkGraph
+    from step4_ibgp import IBGP_TOPOLOGIES
+
+IGPS = ["ospf", "rip", "ibgp"]
+BGP_ROLES = ["none", "peer", "client", "provider"]
+
+
+# Pre-flight check of the whole intent, before any step runs: schema, link
+# symmetry, OSPF metric agreement, address overlaps and address space
+# capacity. Every problem is collected in one pass over the intent (plus a
+# sort of the configured networks for overlaps) and returned as a list.
+def validate_intent(data: dict) -> list:
+    return __validate__(data)[0]
+
+
+# Raise a single ValueError listing every problem, returns the link graph
+# (already built by the validation) otherwise
+def check_intent(data: dict) -> LinkGraph:
+    errors, links = __validate__(data)
+    if errors:
+        raise ValueError(
+            f"{len(errors)} problem(s) in the intent:\n  " + "\n  ".join(errors)
+        )
+    return links
+
+
+def __validate__(data: dict) -> tuple:
+    errors = []
+    if not isinstance(data, dict) or not data:
+        return ["The intent must map AS numbers to their configuration"], None
+
+    structure_ok = True
+    for as_number, as_data in data.items():
+        structure_ok &= __check_as__(errors, as_number, as_data)
+
+    # The link graph needs routers and interfaces to be mappings
+    if not structure_ok:
+        return errors, None
+
+    links = LinkGraph(data)
+    errors.extend(links.errors)
+    __check_links__(errors, data, links)
+    return errors, links
+
+
+# Returns False when the structure is too broken to check the links
+def __check_as__(errors: list, as_number, as_data) -> bool:
+    if not isinstance(as_data, dict):
+        errors.append(f"AS {as_number}: expected a mapping")
+        return False
+
+    igp = as_data.get("igp")
+    if igp is None:
+        errors.append(f"AS {as_number}: missing igp (one of {IGPS})")
+    elif igp not in IGPS:
+        errors.append(f"AS {as_number}: invalid igp '{igp}', expected one of {IGPS}")
+
+    topology = as_data.get("ibgp_topology")
+    if topology is not None and topology not in IBGP_TOPOLOGIES:
+        errors.append(
+            f"AS {as_number}: invalid ibgp_topology '{topology}', expected one of {IBGP_TOPOLOGIES}"
+        )
+
+    routers = as_data.get("routers")
+    if not isinstance(routers, dict) or not routers:
+        errors.append(f"AS {as_number}: missing routers")
+        return False
+
+    loopback_space = __network__(errors, f"AS {as_number}: loopback_space", as_data.get("loopback_space"))
+    if loopback_space is None and "loopback_space" not in as_data:
+        errors.append(f"AS {as_number}: missing loopback_space")
+    elif loopback_space is not None and loopback_space.num_addresses - 1 < len(routers):
+        errors.append(
+            f"AS {as_number}: loopback_space {loopback_space} is too small for {len(routers)} routers"
+        )
+
+    networks_space = __network__(errors, f"AS {as_number}: networks_space", as_data.get("networks_space"))
+    if networks_space is not None and networks_space.num_addresses < SUBNET_SIZE:
+        errors.append(f"AS {as_number}: networks_space {networks_space} is smaller than a /126")
+
+    __check_ibgp_options__(errors, as_number, as_data, routers)
+
+    structure_ok = True
+    for router_id, router in routers.items():
+        hostname = f"{as_number}:{router_id}"
+        if not isinstance(router, dict) or not isinstance(router.get("interfaces"), dict):
+            errors.append(f"{hostname}: missing interfaces")
+            structure_ok = False
+            continue
+
+        for name, interface in router["interfaces"].items():
+            if not isinstance(interface, dict):
+                errors.append(f"{hostname}:{name}: expected a mapping")
+                structure_ok = False
+                continue
+            if not __check_interface__(errors, f"{hostname}:{name}", interface):
+                structure_ok = False
+
+    return structure_ok
+
+
+# route_reflectors (list, or cluster id -> list), rr_cluster, confederation
+# (sub-AS -> list) and their sizes, with the checks step4_ibgp relies on
+def __check_ibgp_options__(errors: list, as_number, as_data: dict, routers: dict):
+    topology = as_data.get("ibgp_topology", "full-mesh")
+    referenced = []
+
+    for option in ["route_reflector_count", "confederation_size"]:
+        value = as_data.get(option)
+        if value is not None and (type(value) is not int or value <= 0):
+            errors.append(f"AS {as_number}: {option} must be a positive integer, not {value!r}")
+
+    explicit = as_data.get("route_reflectors")
+    clusters = None  # Cluster ids, None without explicit clusters
+    reflectors = set()
+    if explicit is not None:
+        if isinstance(explicit, dict):
+            clusters = set(explicit)
+            for cluster_id, rrs in explicit.items():
+                if __is_id_list__(rrs):
+                    referenced += rrs
+                else:
+                    errors.append(
+                        f"AS {as_number}: route_reflectors cluster {cluster_id} must be a list of routers, not {rrs!r}"
+                    )
+        elif __is_id_list__(explicit):
+            referenced += explicit
+        else:
+            errors.append(
+                f"AS {as_number}: route_reflectors must be a list of routers or a mapping of cluster ids to lists, not {explicit!r}"
+            )
+        reflectors = set(referenced)
+
+    if topology == "route-reflector":
+        for router_id, router in routers.items():
+            cluster_id = router.get("rr_cluster") if isinstance(router, dict) else None
+            if cluster_id is None or router_id in reflectors:
+                continue
+            if clusters is None:
+                errors.append(
+                    f"{as_number}:{router_id}: rr_cluster '{cluster_id}' needs route_reflectors given as a mapping of cluster ids"
+                )
+            elif cluster_id not in clusters:
+                errors.append(f"{as_number}:{router_id}: unknown rr_cluster '{cluster_id}'")
+
+    members = as_data.get("confederation")
+    if members is not None:
+        if not isinstance(members, dict) or not members:
+            errors.append(
+                f"AS {as_number}: confederation must map sub-AS numbers to lists of routers, not {members!r}"
+            )
+        else:
+            assigned = []
+            for sub_as, ids in members.items():
+                if type(sub_as) is not int:
+                    errors.append(f"AS {as_number}: confederation sub-AS {sub_as!r} must be an AS number")
+                if __is_id_list__(ids):
+                    assigned += ids
+                else:
+                    errors.append(
+                        f"AS {as_number}: confederation sub-AS {sub_as} must be a list of routers, not {ids!r}"
+                    )
+            referenced += assigned
+            if topology == "confederation":
+                unique = set(assigned)
+                missing = [ri for ri in routers if ri not in unique]
+                if missing:
+                    errors.append(f"AS {as_number}: confederation misses routers {missing}")
+                seen = set()
+                repeated = sorted({ri for ri in assigned if ri in seen or seen.add(ri)})
+                if repeated:
+                    errors.append(
+                        f"AS {as_number}: routers {repeated} are in several confederation sub-ASes"
+                    )
+
+    for router_id in referenced:
+        if router_id not in routers:
+            errors.append(f"AS {as_number}: iBGP options reference unknown router {router_id}")
+
+
+def __is_id_list__(value) -> bool:
+    return isinstance(value, list) and all(isinstance(ri, str) for ri in value)
+
+
+# Returns False when the interface can't be linked
+def __check_interface__(errors: list, where: str, interface: dict) -> bool:
+    neighbour = interface.get("neighbour")
+    if neighbour is not None and not isinstance(neighbour, str):
+        errors.append(f"{where}: neighbour must be a string, not {neighbour!r}")
+        return False
+
+    bgp = interface.get("bgp")
+    if bgp is not None and bgp not in BGP_ROLES:
+        errors.append(f"{where}: invalid bgp '{bgp}', expected one of {BGP_ROLES}")
+
+    metric = interface.get("ospf_metric")
+    if metric is not None and (type(metric) is not int or metric <= 0):
+        errors.append(f"{where}: ospf_metric must be a positive integer, not {metric!r}")
+
+    area = interface.get("ospf_area")
+    if area is not None and (type(area) is not int or area < 0):
+        errors.append(f"{where}: ospf_area must be a non-negative integer, not {area!r}")
+
+    addresses = interface.get("addresses")
+    if addresses is not None and (not isinstance(addresses, list) or not addresses):
+        errors.append(f"{where}: addresses must be a non-empty list")
+        return False
+    for address in addresses or []:
+        if __parse_interface__(address) is None:
+            errors.append(f"{where}: invalid IPv6 address {address!r}")
+    return True
+
+
+def __check_links__(errors: list, data: dict, links: LinkGraph):
+    as_keys = {str(as_number): as_number for as_number in data}
+    # Networks of the intent as (start, end, description), checked for overlaps
+    networks = []
+    owners = {}  # Configured address -> interface using it
+    pending = {}  # AS whose networks_space is used -> links needing a subnet
+
+    for as_number, as_data in data.items():
+        space = __parse_network__(as_data.get("loopback_space"))
+        if space is not None:
+            networks.append(__interval__(space, f"loopback_space of AS {as_number}"))
+
+    for a, b in links.links:
+        where = f"{a[0]}:{a[1]} - {b[0]}:{b[1]}"
+
+        # OSPF metrics must agree (or be set on one side only)
+        metric_a, metric_b = a[2].get("ospf_metric"), b[2].get("ospf_metric")
+        if metric_a is not None and metric_b is not None and metric_a != metric_b:
+            errors.append(f"Link {where}: OSPF metric mismatch ({metric_a} vs {metric_b})")
+
+        configured = [endpoint for endpoint in (a, b) if "addresses" in endpoint[2]]
+        if len(configured) == 1:
+            errors.append(f"Link {where}: addresses on one side only")
+            continue
+
+        # Subnet allocated by step1 from the first networks_space found
+        if not configured:
+            pools = [
+                as_keys[endpoint[0].partition(":")[0]]
+                for endpoint in (a, b)
+                if data[as_keys[endpoint[0].partition(":")[0]]].get("networks_space")
+            ]
+            if not pools:
+                errors.append(f"Link {where}: no addresses and no networks_space to allocate them")
+            else:
+                pending[pools[0]] = pending.get(pools[0], 0) + 1
+            continue
+
+        # Both ends must share a subnet, and no address may be used twice
+        link_networks = []
+        for hostname, name, interface in (a, b):
+            parsed = [__parse_interface__(x) for x in interface["addresses"]]
+            parsed = [x for x in parsed if x is not None]  # Others already reported
+            link_networks.append({x.network for x in parsed})
+            for address in parsed:
+                other = owners.setdefault(address.ip, f"{hostname}:{name}")
+                if other != f"{hostname}:{name}":
+                    errors.append(f"Address {address.ip} is used by {other} and {hostname}:{name}")
+
+        if all(link_networks) and not link_networks[0] & link_networks[1]:
+            errors.append(f"Link {where}: both ends have no subnet in common")
+        for network in link_networks[0] | link_networks[1]:
+            networks.append(__interval__(network, f"link {where}"))
+
+    # Overlapping networks (sweep over the sorted intervals)
+    networks.sort()
+    current = None
+    for interval in networks:
+        if current is not None and interval[0] <= current[1]:
+            errors.append(f"{interval[2]} overlaps {current[2]}")
+            if interval[1] > current[1]:
+                current = interval
+        else:
+            current = interval
+
+    # Enough /126 subnets in each networks_space
+    for as_number, count in pending.items():
+        space = __parse_network__(data[as_number]["networks_space"])
+        if space is not None and count > pool_capacity(space):
+            errors.append(
+                f"AS {as_number}: networks_space {space} is too small for {count} links ({pool_capacity(space)} subnets at most)"
+            )
+
+
+def __network__(errors: list, where: str, value):
+    if value is None:
+        return None
+    network = __parse_network__(value)
+    if network is None:
+        errors.append(f"{where}: invalid IPv6 network {value!r}")
+    return network
+
+
+def __parse_network__(value):
+    try:
+        return ipaddress.IPv6Network(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def __parse_interface__(value):
+    try:
+        return ipaddress.IPv6Interface(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def __interval__(network, description: str) -> tuple:
+    return (
+        int(network.network_address),
+        int(network.broadcast_address),
+        f"{description} ({network})",
+    )
+
+
+def main():
+    from intent import load_intent
+
+    return validate_intent(load_intent("templates/example.yaml"))
+
+
+if __name__ == "__main__":
+    pprint(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os
+import time
+
+try:
+    from src.allocator import read_subnets, write_subnets
+    from src.archive import OUTPUT_DIR
+    from src.ecriture import ecriture_config
+    from src.intent import load_intent
+    from src.validate import check_intent
+    from src.step1 import step1
+    from src.stream import resolve_as
+except ImportError:  # Run as a script from src/
+    from allocator import read_subnets, write_subnets
+    from archive import OUTPUT_DIR
+    from ecriture import ecriture_config
+    from intent import load_intent
+    from validate import check_intent
+    from step1 import step1
+    from stream import resolve_as
+
+POLL_INTERVAL = 0.5  # seconds
+
+
+# Watch mode: the intent and the resolved routers stay in memory, and the
+# intent file is polled. On a change, the new intent is diffed AS by AS
+# (after step1, so that re-allocated link addresses count as changes): only
+# the changed ASes and the ASes linked to them are resolved again, and only
+# the configs whose content changed are rewritten.
+class Watcher:
+    def __init__(
+        self,
+        file_path: str,
+        verbose: bool = False,
+        jobs: int = 1,
+        output_format: str = "dir",
+        on_written=None,
+        use_cache: bool = True,
+        output_dir: str = OUTPUT_DIR,
+    ):
+        self.file_path = file_path
+        self.verbose = verbose
+        self.jobs = jobs
+        self.output_format = output_format
+        self.on_written = on_written  # Called with the rewritten hostnames after each update
+        self.use_cache = use_cache
+        self.output_dir = output_dir
+        self.data = {}
+        self.routers = {}  # as_number -> routers of the AS
+        self.signature = None
+        self.subnets = read_subnets(output_dir)  # Link subnets of the last output
+
+    # Reload the intent and update the outputs, returns the written hostnames
+    def update(self) -> list:
+        start = time.perf_counter()
+        self.signature = __file_signature__(self.file_path)
+        data = load_intent(self.file_path, self.use_cache)
+        self.use_cache = False  # The file only gets loaded again once it changed
+
+        links = check_intent(data)
+        subnets = dict(self.subnets)
+        step1(data, links=links, subnets=subnets)
+
+        first = not self.routers
+        affected = __affected_ases__(self.data, data, links)
+        removed_ases = self.data.keys() - data.keys()
+
+        # The state is only replaced once the new configs are written
+        routers = {
+            as_number: as_routers
+            for as_number, as_routers in self.routers.items()
+            if as_number in data and as_number not in affected
+        }
+        for as_number in affected:
+            routers[as_number] = resolve_as(data, as_number, links)
+
+        removed = {
+            r.hostname
+            for as_number in removed_ases | affected
+            for r in self.routers.get(as_number, [])
+        }
+        removed.difference_update(
+            r.hostname for as_number in affected for r in routers[as_number]
+        )
+
+        # Archives are rewritten as a whole: every router is passed
+        if first or self.output_format != "dir":
+            to_write = [r for as_routers in routers.values() for r in as_routers]
+            removed = None
+        else:
+            to_write = [r for as_number in affected for r in routers[as_number]]
+
+        written = ecriture_config(
+            to_write,
+            self.verbose,
+            self.jobs,
+            output_dir=self.output_dir,
+            output_format=self.output_format,
+            removed=removed,
+        )
+        # Committed once written: after a failure, the same configs are
+        # compared against the old state, and written, on the next update
+        write_subnets(self.output_dir, subnets)
+        self.data = data
+        self.routers = routers
+        self.subnets = subnets
+        print(
+            f"[watch] {len(affected)} AS re-resolved, {len(written)} config(s) written in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        # Called after every update: nodes left behind by a failed export, or
+        # configs written before the watch started, still need to be exported
+        if self.on_written is not None:
+            self.on_written(written)
+        return written
+
+    # Poll the intent file until interrupted (Ctrl+C)
+    def run(self, interval: float = POLL_INTERVAL):
+        try:
+            self.__try_update__()
+            print(f"[watch] Watching {self.file_path} (Ctrl+C to stop)")
+            while True:
+                time.sleep(interval)
+                signature = __file_signature__(self.file_path)
+                if signature is None or signature == self.signature:
+                    continue
+                self.__try_update__()
+        except KeyboardInterrupt:
+            print("[watch] Stopped")
+
+    def __try_update__(self):
+        try:
+            self.update()
+        except Exception as e:
+            # Keep the last valid state, the file is probably being edited
+            print(f"[watch] Intent ignored: {e}")
+
+
+def __file_signature__(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:  # Being replaced by the editor
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# ASes whose (step1 resolved) intent changed, plus the ASes with a link to a
+# router of a changed or removed AS (eBGP addresses, OSPF metrics of peers)
+def __affected_ases__(old: dict, new: dict, links) -> set:
+    changed = {
+        as_number
+        for as_number, as_data in new.items()
+        if old.get(as_number) != as_data
+    }
+    touched = {str(as_number) for as_number in changed | (old.keys() - new.keys())}
+    as_keys = {str(as_number): as_number for as_number in new}
+
+    affected = set(changed)
+    for a, b in links.links:
+        as_a = a[0].partition(":")[0]
+        as_b = b[0].partition(":")[0]
+        if as_a != as_b:
+            if as_a in touched:
+                affected.add(as_keys[as_b])
+            if as_b in touched:
+                affected.add(as_keys[as_a])
+    return affected
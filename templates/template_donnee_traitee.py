@@ -1,4 +1,5 @@
 ### Voici a quoi ressemblent les données après les deux premieres etapes de la pipeline
+### (les étapes manipulent les classes de src/model.py, ce format est celui de Router.template_context() passé au template)
 
 routers = [{'hostname': '111:R1',
             'interfaces':
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Tests import the pipeline modules as `src.*`, like pipeline.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROJECT_NAME = "lab"
+
+
+# In-memory GNS3 server answering the REST calls made through gns3fy:
+# projects, nodes (with start / stop) and links of a single project
+class FakeGns3Server:
+    def __init__(self, node_root: str):
+        self.project_id = str(uuid.uuid4())
+        self.node_root = node_root
+        self.nodes = {}  # node_id -> node
+        self.links = []
+        self.calls = []  # (method, path)
+        self.failing = set()  # Names of the nodes whose start fails
+        self.delay = 0.0  # Seconds taken by a start or stop
+        self.active = 0  # Start / stop calls in progress
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), __handler__(self))
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def add_node(self, name: str, node_type: str = "dynamips") -> dict:
+        node_id = str(uuid.uuid4())
+        node = {
+            "node_id": node_id,
+            "name": name,
+            "node_type": node_type,
+            "project_id": self.project_id,
+            "node_directory": os.path.join(self.node_root, name),
+            "status": "stopped",
+            "console": 5000 + len(self.nodes),
+            "console_host": "127.0.0.1",
+            "ports": [],
+        }
+        with self.lock:
+            self.nodes[node_id] = node
+        return node
+
+    def posts(self, suffix: str) -> int:
+        return sum(1 for method, path in self.calls if method == "POST" and path.endswith(suffix))
+
+    def dynamips_names(self) -> list:
+        return sorted(n["name"] for n in self.nodes.values() if n["node_type"] == "dynamips")
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def __handler__(server: FakeGns3Server):
+    project = f"/v2/projects/{server.project_id}"
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, body, code=200):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def error(self, code, message):
+            self.reply({"status": code, "message": message}, code)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            server.calls.append(("GET", path))
+            if path == "/v2/projects":
+                return self.reply([{"name": PROJECT_NAME, "project_id": server.project_id}])
+            if path == project:
+                return self.reply(
+                    {"name": PROJECT_NAME, "project_id": server.project_id, "status": "opened"}
+                )
+            if path == f"{project}/nodes":
+                return self.reply(list(server.nodes.values()))
+            if path == f"{project}/links":
+                return self.reply(server.links)
+            match = re.fullmatch(rf"{project}/nodes/([\w-]+)", path)
+            if match and match.group(1) in server.nodes:
+                return self.reply(server.nodes[match.group(1)])
+            self.error(404, f"{path} not found")
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            server.calls.append(("POST", path))
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"null")
+
+            if path == f"{project}/nodes":
+                if body["name"] in {n["name"] for n in server.nodes.values()}:
+                    return self.error(409, f"Node name {body['name']} already used")
+                node = server.add_node(body["name"], body["node_type"])
+                node.update({k: v for k, v in body.items() if k not in node})
+                return self.reply(node, 201)
+
+            if path == f"{project}/links":
+                ports = {
+                    (end["node_id"], end["adapter_number"], end["port_number"])
+                    for link in server.links
+                    for end in link["nodes"]
+                }
+                for end in body["nodes"]:
+                    if end["node_id"] not in server.nodes:
+                        return self.error(404, f"Node {end['node_id']} not found")
+                    if (end["node_id"], end["adapter_number"], end["port_number"]) in ports:
+                        return self.error(409, "Port already connected")
+                link = {**body, "link_id": str(uuid.uuid4()), "project_id": server.project_id}
+                with server.lock:
+                    server.links.append(link)
+                return self.reply(link, 201)
+
+            match = re.fullmatch(rf"{project}/nodes/([\w-]+)/(start|stop)", path)
+            if match and match.group(1) in server.nodes:
+                node = server.nodes[match.group(1)]
+                with server.lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                time.sleep(server.delay)
+                with server.lock:
+                    server.active -= 1
+                if match.group(2) == "start" and node["name"] in server.failing:
+                    return self.error(500, f"Dynamips error when running {node['name']}")
+                node["status"] = "started" if match.group(2) == "start" else "stopped"
+                return self.reply(node)
+            self.error(404, f"{path} not found")
+
+    return Handler
+
+
+@pytest.fixture
+def gns3_server(tmp_path):
+    with FakeGns3Server(str(tmp_path / "nodes")) as server:
+        yield server
+
+
+@pytest.fixture
+def example_intent():
+    from src.intent import load_intent
+
+    return load_intent(os.path.join(ROOT, "templates", "example.yaml"), False)
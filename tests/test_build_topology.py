@@ -0,0 +1,54 @@
+import pytest
+
+from src.config_to_gns3 import build_topology
+from src.links import LinkGraph
+
+ROUTERS = ["R1", "R2", "R3", "R4", "R5", "R6"]
+
+
+def test_creates_missing_nodes_and_links(gns3_server, example_intent):
+    gns3_server.add_node("R1")
+    links = LinkGraph(example_intent)
+
+    created = build_topology(False, "lab", example_intent, links, 4, gns3_server.url)
+
+    assert sorted(created) == ROUTERS[1:]
+    assert gns3_server.dynamips_names() == ROUTERS
+    assert len(gns3_server.links) == len(links.links)
+    # Each link joins the ports of the interfaces (GigabitEthernetN/M: adapter N, port M)
+    ids = {n["name"]: n["node_id"] for n in gns3_server.nodes.values()}
+    r1_r2 = {ids["R1"], ids["R2"]}
+    [link] = [l for l in gns3_server.links if {e["node_id"] for e in l["nodes"]} == r1_r2]
+    assert {(e["adapter_number"], e["port_number"]) for e in link["nodes"]} == {(0, 0)}
+
+
+def test_second_run_creates_nothing(gns3_server, example_intent, capsys):
+    build_topology(False, "lab", example_intent, None, 2, gns3_server.url)
+    posts = gns3_server.posts("/nodes") + gns3_server.posts("/links")
+
+    assert build_topology(False, "lab", example_intent, None, 2, gns3_server.url) == []
+    assert gns3_server.posts("/nodes") + gns3_server.posts("/links") == posts
+    assert "0 node(s) et 0 lien(s) créé(s), 5 lien(s) déjà présent(s), 0 en échec" in capsys.readouterr().out
+
+
+def test_name_used_by_another_node_is_reported(gns3_server, example_intent, capsys):
+    gns3_server.add_node("R6", "vpcs")
+
+    created = build_topology(False, "lab", example_intent, None, 1, gns3_server.url)
+
+    output = capsys.readouterr().out
+    assert "Le nom R6 est déjà utilisé par un node vpcs" in output
+    assert sorted(created) == ROUTERS[:5]
+    assert gns3_server.dynamips_names() == ROUTERS[:5]
+    # R3 - R6 isn't created, the other 4 links are
+    assert len(gns3_server.links) == 4
+    assert "4 lien(s) créé(s), 0 lien(s) déjà présent(s), 2 en échec" in output
+
+
+def test_interfaces_without_a_c7200_port_are_rejected_before_any_call(gns3_server, example_intent):
+    interfaces = example_intent[113]["routers"]["R6"]["interfaces"]
+    interfaces["GigabitEthernet7/0"] = interfaces.pop("GigabitEthernet0/0")
+
+    with pytest.raises(ValueError, match="113:R6: interface GigabitEthernet7/0 has no GNS3 port"):
+        build_topology(False, "lab", example_intent, None, 1, gns3_server.url)
+    assert gns3_server.calls == []
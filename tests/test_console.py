@@ -0,0 +1,177 @@
+import asyncio
+import threading
+
+import pytest
+
+from src import console
+from src.console import DO, IAC, WILL, WONT, push_configs
+
+TERMINAL_TYPE = 24
+DIALOG = b"\r\nWould you like to enter the initial configuration dialog? [yes/no]: "
+
+
+# IOS console behind a telnet server: negotiates options, asks the initial
+# configuration dialog, and answers enable / configure terminal / end /
+# write memory with the matching prompts. Commands starting with "bogus" are
+# rejected. `hang`: accepts connections but never answers.
+class FakeConsole:
+    def __init__(self, hang=False):
+        self.hang = hang
+        self.received = {}  # name -> lines received
+        self.negotiation = bytearray()  # Telnet commands sent by the client
+        self.active = 0
+        self.max_active = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.__session__, "127.0.0.1", 0)
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def __session__(self, reader, writer):
+        # Lines are recorded under the router name set by `hostname`
+        lines = []
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        counted = True
+        writer.write(bytes([IAC, WILL, 1, IAC, WILL, 3, IAC, DO, TERMINAL_TYPE]))
+        mode, dialog, name = "user", True, "Router"
+        try:
+            while True:
+                line = await self.__read_line__(reader)
+                if line is None:
+                    return
+                lines.append(line)
+                if self.hang:
+                    continue
+                if dialog:
+                    if line == "no":
+                        dialog = False
+                    else:
+                        writer.write(DIALOG)
+                        continue
+                elif line == "enable":
+                    mode = "enable"
+                elif line == "configure terminal":
+                    mode = "config"
+                    await asyncio.sleep(0.05)  # Sessions overlap
+                elif line.startswith("hostname "):
+                    name = line.split()[1]
+                    self.received[name] = lines
+                elif line.startswith("interface "):
+                    mode = "config-if"
+                elif line.startswith("bogus"):
+                    writer.write(b"\r\n% Invalid input detected at '^' marker.\r\n")
+                elif line == "end":
+                    mode = "enable"
+                elif line == "write memory":
+                    self.active -= 1
+                    counted = False
+                    writer.write(b"\r\nBuilding configuration...\r\n[OK]")
+                prompt = {"user": ">", "enable": "#"}.get(mode, f"({mode})#")
+                writer.write(f"\r\n{name}{prompt}".encode())
+        finally:
+            if counted:
+                self.active -= 1
+            writer.close()
+
+    async def __read_line__(self, reader):
+        line = bytearray()
+        while True:
+            byte = await reader.read(1)
+            if not byte:
+                return None
+            if byte[0] == IAC:
+                self.negotiation += byte + await reader.readexactly(2)
+            elif byte == b"\r":
+                return line.decode()
+            else:
+                line += byte
+
+
+@pytest.fixture
+def fake_console():
+    server = FakeConsole()
+    yield server
+    server.close()
+
+
+def test_pushes_commands_and_saves(fake_console):
+    commands = ["hostname R1", "interface GigabitEthernet0/0", " ipv6 enable"]
+
+    [(name, status, duration, message)] = push_configs(
+        [("R1", "127.0.0.1", fake_console.port, commands)], timeout=5
+    )
+
+    assert (name, status, message) == ("R1", "written", "")
+    lines = fake_console.received["R1"]
+    assert lines[lines.index("no") + 1 :] == [
+        "",
+        "enable",
+        "",
+        "configure terminal",
+        *commands,
+        "end",
+        "write memory",
+    ]
+    # Echo and suppress go-ahead accepted, other options refused
+    negotiation = bytes(fake_console.negotiation)
+    assert bytes([IAC, DO, 1]) in negotiation and bytes([IAC, DO, 3]) in negotiation
+    assert bytes([IAC, WONT, TERMINAL_TYPE]) in negotiation
+
+
+def test_rejected_command_fails(fake_console):
+    commands = ["hostname R2", "bogus command", "interface GigabitEthernet0/0"]
+
+    [(name, status, _, message)] = push_configs(
+        [("R2", "127.0.0.1", fake_console.port, commands)], timeout=5
+    )
+
+    assert status == "failed"
+    assert message.startswith("1 commande(s) refusée(s) : bogus command (% Invalid input")
+    # The other commands are still applied and saved
+    assert fake_console.received["R2"][-3:] == ["interface GigabitEthernet0/0", "end", "write memory"]
+
+
+def test_silent_console_times_out(monkeypatch):
+    monkeypatch.setattr(console, "WAKE_ATTEMPTS", 2)
+    server = FakeConsole(hang=True)
+    try:
+        [(_, status, duration, message)] = push_configs(
+            [("R3", "127.0.0.1", server.port, ["hostname R3"])], timeout=0.3
+        )
+    finally:
+        server.close()
+
+    assert status == "failed"
+    assert "TimeoutError" in message
+    assert duration < 5
+
+
+def test_unreachable_console_fails():
+    [(_, status, _, message)] = push_configs([("R4", "127.0.0.1", 1, ["hostname R4"])], timeout=1)
+    assert status == "failed"
+    assert message.startswith("console 127.0.0.1:1")
+
+
+def test_console_sessions_limits_concurrency(fake_console):
+    count = console.CONSOLE_SESSIONS + 16
+    targets = [
+        (f"X{i}", "127.0.0.1", fake_console.port, [f"hostname X{i}"]) for i in range(count)
+    ]
+
+    results = push_configs(targets, timeout=10)
+
+    assert [status for _, status, _, _ in results] == ["written"] * count
+    assert fake_console.max_active == console.CONSOLE_SESSIONS
+
+
+def test_sessions_argument_limits_concurrency(fake_console):
+    targets = [(f"Y{i}", "127.0.0.1", fake_console.port, [f"hostname Y{i}"]) for i in range(8)]
+
+    push_configs(targets, sessions=3, timeout=10)
+
+    assert fake_console.max_active == 3
@@ -0,0 +1,88 @@
+from src.delta import config_delta
+
+CONFIG = """version 15.2
+hostname R2
+!
+interface Loopback0
+ ipv6 address 2001:1::2/128
+ ipv6 ospf 1 area 0
+!
+interface GigabitEthernet0/0
+ ipv6 address 2001:db8::2/126
+ ipv6 ospf 1 area 0
+ ipv6 ospf cost 10
+!
+interface GigabitEthernet1/0
+ ipv6 address 2001:db8::5/126
+!
+router bgp 112
+ bgp router-id 1.1.1.2
+ neighbor 2001:db8::6 remote-as 113
+ !
+ address-family ipv6
+  neighbor 2001:db8::6 activate
+  redistribute connected
+ exit-address-family
+!
+end
+"""
+
+
+def test_identical_configs_give_no_command():
+    assert config_delta(CONFIG, CONFIG) == []
+
+
+def test_neighbour_is_deactivated_before_being_removed():
+    config = CONFIG.replace("2001:db8::6", "2001:db8::7")
+
+    assert config_delta(CONFIG, config) == [
+        "router bgp 112",
+        " address-family ipv6",
+        "  no neighbor 2001:db8::6 activate",
+        "  exit",
+        " no neighbor 2001:db8::6 remote-as 113",
+        "router bgp 112",
+        " neighbor 2001:db8::7 remote-as 113",
+        " address-family ipv6",
+        "  neighbor 2001:db8::7 activate",
+        "  exit",
+    ]
+
+
+def test_ospf_cost_change_only_enters_the_interface():
+    config = CONFIG.replace("ipv6 ospf cost 10", "ipv6 ospf cost 50")
+
+    assert config_delta(CONFIG, config) == [
+        "interface GigabitEthernet0/0",
+        " no ipv6 ospf cost 10",
+        "interface GigabitEthernet0/0",
+        " ipv6 ospf cost 50",
+    ]
+
+
+def test_removed_interface_is_reset_to_its_defaults():
+    config = CONFIG.replace("interface GigabitEthernet1/0\n ipv6 address 2001:db8::5/126\n", "")
+
+    assert config_delta(CONFIG, config) == ["default interface GigabitEthernet1/0"]
+
+
+def test_without_previous_config_every_command_is_added():
+    assert config_delta(None, CONFIG) == [
+        "hostname R2",
+        "interface Loopback0",
+        " ipv6 address 2001:1::2/128",
+        " ipv6 ospf 1 area 0",
+        "interface GigabitEthernet0/0",
+        " ipv6 address 2001:db8::2/126",
+        " ipv6 ospf 1 area 0",
+        " ipv6 ospf cost 10",
+        "interface GigabitEthernet1/0",
+        " ipv6 address 2001:db8::5/126",
+        "router bgp 112",
+        " bgp router-id 1.1.1.2",
+        " neighbor 2001:db8::6 remote-as 113",
+        " address-family ipv6",
+        "  neighbor 2001:db8::6 activate",
+        "  redistribute connected",
+        "  exit",
+    ]
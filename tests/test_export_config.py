@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from src.config_to_gns3 import export_config
+from src.watch import Watcher
+
+ROUTERS = [f"R{i}" for i in range(1, 7)]
+
+
+@pytest.fixture
+def lab(gns3_server, tmp_path):
+    config_dir = tmp_path / "output"
+    config_dir.mkdir()
+    for name in ROUTERS:
+        gns3_server.add_node(name)
+        (config_dir / f"{name}.cfg").write_text(f"hostname {name}\n")
+    return gns3_server, str(config_dir)
+
+
+def startup_config(server, name: str) -> str:
+    [node] = [n for n in server.nodes.values() if n["name"] == name]
+    configs = os.path.join(node["node_directory"], "configs")
+    [file] = os.listdir(configs)
+    with open(os.path.join(configs, file)) as f:
+        return f.read()
+
+
+def write_startup_config(server, name: str, content: str):
+    [node] = [n for n in server.nodes.values() if n["name"] == name]
+    configs = os.path.join(node["node_directory"], "configs")
+    os.makedirs(configs)
+    with open(os.path.join(configs, "i2_startup-config.cfg"), "w") as f:
+        f.write(content)
+
+
+def test_exports_on_workers_and_reports_each_node(lab, capsys):
+    server, config_dir = lab
+    server.delay = 0.1
+    write_startup_config(server, "R2", "hostname R2\n")  # Already up to date
+    server.failing.add("R5")
+
+    results = export_config(True, "lab", None, 3, server.url, config_dir)
+
+    statuses = {name: status for name, status, _ in results}
+    assert statuses == {
+        "R1": "written",
+        "R2": "skipped",
+        "R3": "written",
+        "R4": "written",
+        "R5": "failed",
+        "R6": "written",
+    }
+    # 5 nodes restarted (stop then start), never more than 3 at once
+    assert server.max_active == 3
+    for name in ["R1", "R3", "R4", "R6"]:
+        assert startup_config(server, name) == f"hostname {name}\n"
+    # Not restarted: the startup config is removed so that R5 is exported again
+    [r5] = [n for n in server.nodes.values() if n["name"] == "R5"]
+    assert os.listdir(os.path.join(r5["node_directory"], "configs")) == []
+
+    output = capsys.readouterr().out
+    assert "[!] Erreur sur R5 : 500: Dynamips error when running R5" in output
+    assert "[t] R1 : written en" in output
+    assert "[=] 4 config(s) écrite(s), 1 ignorée(s), 1 en échec" in output
+
+
+def test_single_worker_is_sequential(lab):
+    server, config_dir = lab
+    server.delay = 0.02
+
+    export_config(False, "lab", None, 1, server.url, config_dir)
+
+    assert server.max_active == 1
+    assert server.posts("/start") == len(ROUTERS)
+
+
+def test_unchanged_configs_are_skipped(lab):
+    server, config_dir = lab
+    export_config(False, "lab", None, 4, server.url, config_dir)
+    restarts = server.posts("/start")
+
+    results = export_config(False, "lab", None, 4, server.url, config_dir)
+
+    assert {status for _, status, _ in results} == {"skipped"}
+    assert server.posts("/start") == restarts
+
+    # Only the node whose config changed is restarted
+    with open(os.path.join(config_dir, "R3.cfg"), "a") as f:
+        f.write("ipv6 unicast-routing\n")
+    results = export_config(False, "lab", None, 4, server.url, config_dir)
+    assert [name for name, status, _ in results if status == "written"] == ["R3"]
+    assert server.posts("/start") == restarts + 1
+
+
+def test_only_listed_nodes_are_exported(lab):
+    server, config_dir = lab
+
+    results = export_config(False, "lab", {"R1", "R4"}, 2, server.url, config_dir)
+
+    assert sorted(name for name, status, _ in results if status == "written") == ["R1", "R4"]
+    assert server.posts("/start") == 2
+
+
+# pipeline.py run from `cwd` (output/ is written there)
+def run_pipeline(cwd, *arguments):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if not os.path.exists(os.path.join(cwd, "templates")):
+        os.symlink(os.path.join(root, "templates"), os.path.join(cwd, "templates"))
+    return subprocess.run(
+        [sys.executable, os.path.join(root, "pipeline.py"), *arguments],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def test_configs_generated_before_the_export_are_written(gns3_server, tmp_path):
+    for name in ROUTERS:
+        gns3_server.add_node(name)
+    run_pipeline(tmp_path)  # Configs generated without -p
+    gns3_server.failing.add("R5")
+
+    output = run_pipeline(tmp_path, "-p", "lab", "--gns3-url", gns3_server.url)
+
+    assert "[=] 5 config(s) écrite(s), 0 ignorée(s), 1 en échec" in output
+    for name in ["R1", "R2", "R3", "R4", "R6"]:
+        assert startup_config(gns3_server, name) == (tmp_path / "output" / f"{name}.cfg").read_text()
+
+    # The node whose export failed is retried, the others are up to date
+    gns3_server.failing.clear()
+    output = run_pipeline(tmp_path, "-p", "lab", "--gns3-url", gns3_server.url)
+
+    assert "[=] 1 config(s) écrite(s), 5 ignorée(s), 0 en échec" in output
+    assert startup_config(gns3_server, "R5") == (tmp_path / "output" / "R5.cfg").read_text()
+
+
+def test_watch_exports_configs_that_are_already_current(lab, example_intent, tmp_path):
+    server, _ = lab
+    intent = tmp_path / "intent.yaml"
+    intent.write_text(yaml.safe_dump(example_intent))
+    output_dir = str(tmp_path / "watch")
+    export = lambda written: export_config(False, "lab", None, 1, server.url, output_dir)
+    Watcher(str(intent), output_dir=output_dir, use_cache=False).update()
+
+    Watcher(str(intent), output_dir=output_dir, on_written=export, use_cache=False).update()
+
+    for name in ROUTERS:
+        with open(os.path.join(output_dir, f"{name}.cfg")) as f:
+            assert startup_config(server, name) == f.read()
@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+from src.gns3_project import interface_port, write_project
+
+
+@pytest.mark.parametrize(
+    "ifname, port",
+    [
+        ("GigabitEthernet0/0", ("GigabitEthernet", 0, 0)),
+        ("FastEthernet6/0", ("FastEthernet", 6, 0)),
+    ],
+)
+def test_interface_port(ifname, port):
+    assert interface_port("111:R1", ifname) == port
+
+
+@pytest.mark.parametrize("ifname", ["GigabitEthernet7/0", "GigabitEthernet1/1", "Serial0/0"])
+def test_interfaces_without_a_c7200_port_are_rejected(ifname):
+    with pytest.raises(ValueError, match=f"111:R1: interface {ifname} has no GNS3 port"):
+        interface_port("111:R1", ifname)
+
+
+def test_project_nodes_use_port_adapters(example_intent, tmp_path):
+    (tmp_path / "configs").mkdir()
+    path = write_project(example_intent, str(tmp_path / "lab"), str(tmp_path / "configs"))
+
+    with open(path) as f:
+        project = json.load(f)
+    nodes = {n["name"]: n for n in project["topology"]["nodes"]}
+    assert nodes["R1"]["properties"]["slot0"] == "C7200-IO-GE-E"
+    assert nodes["R1"]["properties"]["slot1"] == "PA-GE"
+    assert len(project["topology"]["links"]) == 5
+
+
+def test_out_of_range_slots_write_nothing(example_intent, tmp_path):
+    for router_id in ["R4", "R5"]:
+        interfaces = example_intent[111]["routers"][router_id]["interfaces"]
+        interfaces["GigabitEthernet9/0"] = interfaces.pop("GigabitEthernet0/0")
+
+    with pytest.raises(ValueError, match="^2 interface"):
+        write_project(example_intent, str(tmp_path / "lab"), str(tmp_path / "configs"))
+    assert not os.path.exists(tmp_path / "lab")
@@ -0,0 +1,95 @@
+import copy
+
+from src.allocator import read_subnets, write_subnets
+from src.step1 import step1
+from src.topology_generator import generate_intent
+
+
+# Ring of 12 links in a /122: 16 /126 subnets, so slots collide
+def crowded_ring() -> dict:
+    data = generate_intent("ring", 12)
+    data[100]["networks_space"] = "2001:db8::/122"
+    return data
+
+
+def add_link(data: dict, router_id: str) -> dict:
+    data = copy.deepcopy(data)
+    data[100]["routers"]["RX"] = {"interfaces": {"GigabitEthernet0/0": {"neighbour": router_id}}}
+    interfaces = data[100]["routers"][router_id]["interfaces"]
+    interfaces[f"GigabitEthernet{len(interfaces)}/0"] = {"neighbour": "RX"}
+    return data
+
+
+def addresses(data: dict) -> dict:
+    return {
+        (router_id, name): interface["addresses"]
+        for router_id, router in data[100]["routers"].items()
+        for name, interface in router["interfaces"].items()
+    }
+
+
+def test_new_link_in_a_crowded_pool_keeps_existing_subnets(tmp_path):
+    data = crowded_ring()
+    subnets = {}
+    step1(data, subnets=subnets)
+    before = addresses(data)
+    assert len(subnets) == 12
+    write_subnets(str(tmp_path), subnets)
+
+    grown = add_link(crowded_ring(), "R2")
+    previous = read_subnets(str(tmp_path))
+    assert previous == subnets
+    subnets = dict(previous)
+    step1(grown, subnets=subnets)
+
+    after = addresses(grown)
+    assert {k: after[k] for k in before} == before
+    assert len(subnets) == 13
+    assert subnets["100:R2-100:RX"] not in previous.values()
+
+
+def test_without_previous_subnets_a_new_link_can_renumber_others():
+    data = crowded_ring()
+    step1(data)
+    before = addresses(data)
+
+    grown = add_link(crowded_ring(), "R2")
+    step1(grown)
+
+    after = addresses(grown)
+    assert any(after[k] != before[k] for k in before)
+
+
+def test_previous_subnets_outside_the_pool_are_reallocated():
+    data = crowded_ring()
+    subnets = {"100:R1-100:R2": "2001:db9::/126", "100:R2-100:R3": "not a subnet"}
+    step1(data, subnets=subnets)
+
+    assert all(subnet.startswith("2001:db8:") for subnet in subnets.values())
+    assert len(set(subnets.values())) == 12
+
+
+def test_subnets_are_allocated_first_fit_in_each_pool(example_intent):
+    example_intent[111]["routers"]["R5"]["interfaces"]["GigabitEthernet0/0"]["addresses"] = ["2001:db8:1::5/126"]
+    example_intent[111]["routers"]["R4"]["interfaces"]["GigabitEthernet1/0"]["addresses"] = ["2001:db8:1::6/126"]
+    subnets = {}
+    step1(example_intent, subnets=subnets)
+
+    # 2001:db8:1::4/126 is configured by the user and skipped
+    assert subnets == {
+        "111:R1-111:R4": "2001:db8:1::/126",
+        "111:R1-112:R2": "2001:db8:1::8/126",
+        "112:R2-113:R3": "2001:db8:2::/126",
+        "113:R3-113:R6": "2001:db8:3::/126",
+    }
+
+
+def test_reserved_ranges_are_skipped_at_once():
+    data = generate_intent("linear", 3)
+    data[100]["networks_space"] = "2001:db8::/48"
+    data[100]["routers"]["R3"]["interfaces"]["GigabitEthernet1/0"] = {"neighbour": "R4", "addresses": ["2001:db8::1/64"]}
+    data[100]["routers"]["R4"] = {"interfaces": {"GigabitEthernet0/0": {"neighbour": "R3", "addresses": ["2001:db8::2/64"]}}}
+    subnets = {}
+    step1(data, subnets=subnets)
+
+    assert subnets == {"100:R1-100:R2": "2001:db8:0:1::/126", "100:R2-100:R3": "2001:db8:0:1::4/126"}
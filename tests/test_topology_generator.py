@@ -0,0 +1,52 @@
+import ipaddress
+
+import pytest
+
+from src.simulate import simulate_routing
+from src.step1 import step1
+from src.step2 import step2
+from src.step3 import step3
+from src.step4_ospf import step4_ospf
+from src.topology_generator import MAX_ROUTERS, generate_intent
+from src.validate import check_intent
+
+
+def test_router_ids_stay_valid_and_distinct_beyond_255_routers():
+    data = generate_intent("ring", 600)
+    links = check_intent(data)
+    step1(data, False, links)
+    routers = step3(data, step2(data), links=links)
+    routers = step4_ospf(data, routers, links=links)
+
+    router_ids = [router.ipv4_router_id for router in routers]
+    assert router_ids[0] == "1.1.1.1"
+    assert router_ids[254] == "1.1.1.255"
+    assert router_ids[255] == "1.1.2.0"
+    assert len(set(router_ids)) == 600
+    for router_id in router_ids:
+        ipaddress.IPv4Address(router_id)
+    assert simulate_routing(routers).ok
+
+
+def test_too_many_routers_are_rejected():
+    with pytest.raises(ValueError, match="Too many routers"):
+        generate_intent("linear", MAX_ROUTERS + 1)
+
+
+def test_interfaces_keep_their_creation_order():
+    data = generate_intent("multi-as", 6, 2)
+
+    interfaces = data[100]["routers"]["R3"]["interfaces"]
+    assert list(interfaces) == ["GigabitEthernet0/0", "GigabitEthernet1/0", "GigabitEthernet2/0"]
+    assert interfaces["GigabitEthernet2/0"] == {"neighbour": "101:R4", "bgp": "peer"}
+
+
+def test_clos_links_grow_linearly_with_the_routers():
+    for routers in (100, 1000):
+        data = generate_intent("clos", routers)
+        interfaces = {ri: r["interfaces"] for ri, r in data[100]["routers"].items()}
+
+        assert sum(len(i) for i in interfaces.values()) == 2 * 4 * (routers - 4)
+        assert all(len(interfaces[f"R{i}"]) == 4 for i in range(5, routers + 1))
+
+    assert len(generate_intent("clos", 20, spines=2)[100]["routers"]["R20"]["interfaces"]) == 2
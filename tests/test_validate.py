@@ -0,0 +1,139 @@
+import pytest
+
+from src.validate import check_intent, validate_intent
+
+
+def interfaces(data, as_number, router_id):
+    return data[as_number]["routers"][router_id]["interfaces"]
+
+
+def test_example_intent_is_valid(example_intent):
+    assert validate_intent(example_intent) == []
+    assert len(check_intent(example_intent).links) == 5
+
+
+def test_every_problem_is_reported_at_once(example_intent):
+    del example_intent[111]["igp"]
+    example_intent[112]["ibgp_topology"] = "star"
+    interfaces(example_intent, 111, "R4")["GigabitEthernet1/0"]["ospf_metric"] = -1
+
+    with pytest.raises(ValueError, match="^3 problem"):
+        check_intent(example_intent)
+
+
+@pytest.mark.parametrize(
+    "change, error",
+    [
+        (lambda d: d.__setitem__(111, []), "AS 111: expected a mapping"),
+        (lambda d: d[111].__setitem__("igp", "isis"), "AS 111: invalid igp 'isis'"),
+        (lambda d: d[111].__setitem__("routers", {}), "AS 111: missing routers"),
+        (lambda d: d[111].pop("loopback_space"), "AS 111: missing loopback_space"),
+        (lambda d: d[111].__setitem__("loopback_space", "2001:1:1:1::/127"), "too small for 3 routers"),
+        (lambda d: d[111].__setitem__("networks_space", "2001:db8::/127"), "smaller than a /126"),
+        (lambda d: d[111].__setitem__("networks_space", "nope"), "invalid IPv6 network 'nope'"),
+        (lambda d: d[111]["routers"].__setitem__("R9", {}), "111:R9: missing interfaces"),
+    ],
+)
+def test_as_structure(example_intent, change, error):
+    change(example_intent)
+
+    assert any(error in e for e in validate_intent(example_intent))
+
+
+@pytest.mark.parametrize(
+    "interface, error",
+    [
+        ({"neighbour": 4}, "neighbour must be a string"),
+        ({"neighbour": "R5", "bgp": "friend"}, "invalid bgp 'friend'"),
+        ({"neighbour": "R5", "ospf_metric": 0}, "ospf_metric must be a positive integer"),
+        ({"neighbour": "R5", "ospf_area": "0"}, "ospf_area must be a non-negative integer"),
+        ({"neighbour": "R5", "addresses": []}, "addresses must be a non-empty list"),
+        ({"neighbour": "R5", "addresses": ["2001:db8::1"]}, "addresses on one side only"),
+    ],
+)
+def test_interface_fields(example_intent, interface, error):
+    interfaces(example_intent, 111, "R4")["GigabitEthernet1/0"] = interface
+
+    assert any(error in e for e in validate_intent(example_intent))
+
+
+def test_links(example_intent):
+    interfaces(example_intent, 111, "R1")["GigabitEthernet2/0"] = {"neighbour": "R7"}
+    interfaces(example_intent, 113, "R6")["GigabitEthernet1/0"] = {"neighbour": "R3"}
+    interfaces(example_intent, 111, "R5")["GigabitEthernet0/0"]["ospf_metric"] = 20
+
+    errors = validate_intent(example_intent)
+
+    assert "111:R1:GigabitEthernet2/0 references unknown router 111:R7" in errors
+    assert any("113:R6:GigabitEthernet1/0 has neighbour 113:R3, but" in e for e in errors)
+    assert any("OSPF metric mismatch (10 vs 20)" in e for e in errors)
+
+
+def test_configured_addresses(example_intent):
+    r4, r5 = interfaces(example_intent, 111, "R4"), interfaces(example_intent, 111, "R5")
+    r4["GigabitEthernet1/0"]["addresses"] = ["2001:db8:1::1/126"]
+    r5["GigabitEthernet0/0"]["addresses"] = ["2001:db8:2::2/126"]
+    r1 = interfaces(example_intent, 111, "R1")
+    r1["GigabitEthernet1/0"]["addresses"] = ["2001:db8:1::1/64"]
+    r4["GigabitEthernet0/0"]["addresses"] = ["2001:1:1:1::5/64"]
+
+    errors = validate_intent(example_intent)
+
+    assert any("both ends have no subnet in common" in e for e in errors)
+    assert "Address 2001:db8:1::1 is used by 111:R1:GigabitEthernet1/0 and 111:R4:GigabitEthernet1/0" in errors
+    assert any(e.startswith("loopback_space of AS 111 (2001:1:1:1::/64) overlaps link") for e in errors)
+
+
+def test_networks_space_capacity(example_intent):
+    example_intent[111]["networks_space"] = "2001:db8:1::/125"
+
+    assert "AS 111: networks_space 2001:db8:1::/125 is too small for 3 links (2 subnets at most)" in validate_intent(example_intent)
+
+
+def test_route_reflector_options(example_intent):
+    as_data = example_intent[112]
+    as_data["ibgp_topology"] = "route-reflector"
+    as_data["route_reflectors"] = "R2"
+    assert any("route_reflectors must be a list" in e for e in validate_intent(example_intent))
+
+    as_data["route_reflectors"] = {1: ["R2"], 2: "R2"}
+    assert any("cluster 2 must be a list" in e for e in validate_intent(example_intent))
+
+    as_data["routers"]["R2"]["rr_cluster"] = 3
+    as_data["route_reflectors"] = ["R7"]
+    errors = validate_intent(example_intent)
+    assert "AS 112: iBGP options reference unknown router R7" in errors
+    assert any("rr_cluster '3' needs route_reflectors given as a mapping" in e for e in errors)
+
+    as_data["route_reflectors"] = {1: ["R7"]}
+    assert "112:R2: unknown rr_cluster '3'" in validate_intent(example_intent)
+
+
+def test_confederation_options(example_intent):
+    as_data = example_intent[113]
+    as_data["ibgp_topology"] = "confederation"
+    as_data["confederation"] = {65001: ["R3"], "65002": ["R3"]}
+
+    errors = validate_intent(example_intent)
+
+    assert "AS 113: confederation misses routers ['R6']" in errors
+    assert "AS 113: routers ['R3'] are in several confederation sub-ASes" in errors
+    assert "AS 113: confederation sub-AS '65002' must be an AS number" in errors
+
+    as_data["confederation"] = []
+    assert any("confederation must map sub-AS numbers" in e for e in validate_intent(example_intent))
+
+
+@pytest.mark.parametrize("option", ["route_reflector_count", "confederation_size"])
+@pytest.mark.parametrize("value", ["two", "3", 0.5, 0, -1, True])
+def test_ibgp_sizes_must_be_positive_integers(example_intent, option, value):
+    example_intent[112][option] = value
+
+    assert f"AS 112: {option} must be a positive integer, not {value!r}" in validate_intent(example_intent)
+
+
+@pytest.mark.parametrize("option", ["route_reflector_count", "confederation_size"])
+def test_valid_ibgp_sizes(example_intent, option):
+    example_intent[112][option] = 2
+
+    assert validate_intent(example_intent) == []
@@ -0,0 +1,84 @@
+import pytest
+
+from src.simulate import RoutingSimulation, simulate_routing
+from src.step1 import step1
+from src.step2 import step2
+from src.step3 import step3
+from src.step4_ibgp import step4_ibgp
+from src.step4_ospf import step4_ospf
+from src.topology_generator import generate_intent
+from src.validate import check_intent
+
+
+# Steps 1 to 4, as run by pipeline.py before --verify
+def resolve(data: dict) -> list:
+    links = check_intent(data)
+    step1(data, False, links)
+    routers = step2(data)
+    routers = step3(data, routers, links=links)
+    routers = step4_ospf(data, routers, links=links)
+    return step4_ibgp(data, routers, links=links)
+
+
+# Ring of 64 routers split in 8 sub-ASes, with an external router X1 (AS 200)
+# attached to `border`
+def confederation_ring(border: str) -> dict:
+    data = generate_intent("ring", 64, igps=("ibgp",))
+    data[100]["ibgp_topology"] = "confederation"
+    interfaces = data[100]["routers"][border]["interfaces"]
+    interfaces[f"GigabitEthernet{len(interfaces)}/0"] = {"neighbour": "200:X1", "bgp": "peer"}
+    data[200] = {
+        "igp": "ibgp",
+        "loopback_space": "2001:200::/64",
+        "networks_space": "2001:db8:200::/48",
+        "routers": {
+            "X1": {"interfaces": {"GigabitEthernet0/0": {"neighbour": f"100:{border}", "bgp": "peer"}}}
+        },
+    }
+    return data
+
+
+def test_confederation_ring_is_fully_reachable():
+    data = generate_intent("ring", 64, igps=("ibgp",))
+    data[100]["ibgp_topology"] = "confederation"
+
+    simulation = simulate_routing(resolve(data))
+
+    assert simulation.ok
+
+
+# The routes of X1 cross every sub-AS: a next hop rewritten at each sub-AS
+# border used to point back through the router forwarding to it
+@pytest.mark.parametrize("border", ["R9", "R20", "R40", "R57"])
+def test_confederation_ring_with_external_as_has_no_forwarding_loop(border):
+    simulation = simulate_routing(resolve(confederation_ring(border)))
+
+    assert simulation.problems == []
+    assert simulation.sessions_down == []
+    assert simulation.unreachable_pairs() == []
+
+
+# OSPF routes (distance 110) replace the BGP routes inside an AS: the loopbacks
+# of an AS whose sessions stay inside it aren't propagated through BGP, the
+# loopbacks of a multi-AS intent still are
+@pytest.mark.parametrize(
+    "topology, ases, propagated",
+    [("ring", 1, 0), ("multi-as", 3, 30)],
+)
+def test_bgp_propagates_only_the_loopbacks_leaving_their_as(monkeypatch, topology, ases, propagated):
+    data = generate_intent(topology, 30, ases, igps=("ibgp",))
+    for as_data in data.values():
+        as_data["ibgp_topology"] = "route-reflector"
+    prefixes = []
+    bgp_best = RoutingSimulation.__bgp_best__
+
+    def counting_bgp_best(self, origins, prefix, resolve_links=True):
+        if resolve_links:
+            prefixes.append(prefix)
+        return bgp_best(self, origins, prefix, resolve_links)
+
+    monkeypatch.setattr(RoutingSimulation, "__bgp_best__", counting_bgp_best)
+    simulation = simulate_routing(resolve(data))
+
+    assert simulation.ok
+    assert len(prefixes) == propagated
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+import yaml
+
+import src.watch
+from src.topology_generator import generate_intent
+from src.watch import Watcher
+
+
+@pytest.fixture
+def intent_file(tmp_path):
+    path = tmp_path / "intent.yaml"
+    path.write_text(yaml.safe_dump(generate_intent("multi-as", 9, 3)))
+    return path
+
+
+def edit(path, change):
+    data = yaml.safe_load(path.read_text())
+    change(data)
+    path.write_text(yaml.safe_dump(data))
+
+
+def set_metric(data):
+    data[100]["routers"]["R1"]["interfaces"]["GigabitEthernet0/0"]["ospf_metric"] = 5
+    data[100]["routers"]["R2"]["interfaces"]["GigabitEthernet0/0"]["ospf_metric"] = 5
+
+
+def test_invalid_intent_at_startup_is_reported_and_watched(intent_file, tmp_path, monkeypatch, capsys):
+    intent_file.write_text("100: {igp: ospf}\n")
+    polls = []
+
+    def sleep(interval):
+        polls.append(interval)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(src.watch.time, "sleep", sleep)
+    Watcher(str(intent_file), output_dir=str(tmp_path / "out"), use_cache=False).run()
+
+    output = capsys.readouterr().out
+    assert "[watch] Intent ignored" in output
+    assert "[watch] Watching" in output
+    assert polls  # Still polling after the failed first update
+
+
+def test_configs_whose_write_failed_are_written_on_the_next_update(intent_file, tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "out")
+    watcher = Watcher(str(intent_file), output_dir=output_dir, use_cache=False)
+    assert len(watcher.update()) == 9
+
+    write = src.watch.ecriture_config
+
+    def failing_write(*args, **kwargs):
+        raise OSError("disk full")
+
+    edit(intent_file, set_metric)
+    monkeypatch.setattr(src.watch, "ecriture_config", failing_write)
+    with pytest.raises(OSError):
+        watcher.update()
+
+    # The next edit, in AS 102 (not linked to AS 100), still rewrites R1 and R2
+    edit(intent_file, lambda data: data[102]["routers"]["R9"].update(note=None))
+    monkeypatch.setattr(src.watch, "ecriture_config", write)
+    written = watcher.update()
+
+    assert {"100:R1", "100:R2"} <= set(written)
+    with open(os.path.join(output_dir, "R1.cfg")) as f:
+        assert "cost 5" in f.read()